@@ -126,6 +126,11 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Hand report downloads to the front web server (zero-copy sendfile) when it supports it
+# 'X-Accel-Redirect' (nginx: internal location aliasing MEDIA_ROOT) or 'X-Sendfile' (Apache)
+SENDFILE_HEADER = os.getenv('SENDFILE_HEADER', '')
+SENDFILE_URL_PREFIX = os.getenv('SENDFILE_URL_PREFIX', '/protected/')
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -200,6 +205,19 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+# Parse/score/report tasks vary widely in duration: fetch one at a time and
+# ack after completion so a slow task can't hold queued work hostage
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_ACKS_LATE = True
+# Task results (and the compiled PDFs/QueuedTask rows they point at) are kept this long
+CELERY_RESULT_EXPIRES = 24 * 60 * 60
+# Run by the worker's embedded beat (celery worker -B)
+CELERY_BEAT_SCHEDULE = {
+    'prune-expired-task-output': {
+        'task': 'core.tasks.prune_expired_task_output',
+        'schedule': 60 * 60,
+    },
+}
 
 # LLM Configuration
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
@@ -213,4 +231,9 @@ ML_CONFIDENCE_THRESHOLD = float(os.getenv('ML_CONFIDENCE_THRESHOLD', '0.7'))
 
 # File Upload Settings
 MAX_UPLOAD_SIZE = 100 * 1024 * 1024  # 100MB
+# Hash uploads as they stream in (exposes UploadedFile.sha256)
+FILE_UPLOAD_HANDLERS = [
+    'core.upload_handlers.HashingMemoryFileUploadHandler',
+    'core.upload_handlers.HashingTemporaryFileUploadHandler',
+]
 ALLOWED_LOG_TYPES = ['.csv', '.log', '.txt', '.evtx', '.json']
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Case, EvidenceFile, ParsedEvent, ScoredEvent,
-    StoryPattern, InvestigationNote, Report
+    StoryPattern, InvestigationNote, Report, QueuedTask
 )
 
 @admin.register(Case)
@@ -45,3 +45,9 @@ class ReportAdmin(admin.ModelAdmin):
     list_display = ['case', 'format', 'version', 'generated_by', 'generated_at']
     list_filter = ['format', 'generated_at']
     search_fields = ['file_hash']
+
+@admin.register(QueuedTask)
+class QueuedTaskAdmin(admin.ModelAdmin):
+    list_display = ['task_id', 'user', 'created_at']
+    list_filter = ['created_at']
+    search_fields = ['task_id']
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:40
+
+from django.db import migrations, models
+
+
+def backfill_event_counters(apps, schema_editor):
+    Case = apps.get_model('core', 'Case')
+    ScoredEvent = apps.get_model('core', 'ScoredEvent')
+    for case_id in Case.objects.values_list('id', flat=True):
+        counts = ScoredEvent.objects.filter(
+            parsed_event__evidence_file__case_id=case_id
+        ).aggregate(
+            total_events=models.Count('id'),
+            high_risk_events=models.Count('id', filter=models.Q(risk_label='HIGH')),
+            critical_events=models.Count('id', filter=models.Q(risk_label='CRITICAL')),
+        )
+        Case.objects.filter(pk=case_id).update(**counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_parsedevent_extra_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='case',
+            name='critical_events',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='case',
+            name='high_risk_events',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='case',
+            name='total_events',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_event_counters, migrations.RunPython.noop),
+    ]
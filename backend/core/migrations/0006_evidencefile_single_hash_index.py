@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_case_event_counters'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='evidencefile',
+            name='core_eviden_file_ha_a6f384_idx',
+        ),
+        migrations.AlterField(
+            model_name='evidencefile',
+            name='file_hash',
+            field=models.CharField(max_length=64),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-15 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_evidencefile_single_hash_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='scoredevent',
+            name='core_scored_risk_la_b81918_idx',
+        ),
+        migrations.AddIndex(
+            model_name='scoredevent',
+            index=models.Index(condition=models.Q(('is_archived', False)), fields=['risk_label'], name='se_risk_active'),
+        ),
+    ]
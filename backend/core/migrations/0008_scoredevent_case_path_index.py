@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-15 23:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_scoredevent_active_risk_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='scoredevent',
+            index=models.Index(fields=['parsed_event', 'is_archived', 'risk_label', 'confidence'], name='core_scored_parsed__f8f95b_idx'),
+        ),
+    ]
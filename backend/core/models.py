@@ -3,9 +3,40 @@ Core Django models for forensic log analysis system
 Implements chain of custody, parsing, scoring, and story synthesis
 """
 from django.db import models
+from django.db.models.functions import Coalesce, Substr
 from django.contrib.auth.models import User
 from django.utils import timezone
-import hashlib
+
+
+def count_subquery(queryset):
+    """Correlated COUNT as a scalar subquery (no GROUP BY/join fan-out on the outer query)"""
+    return Coalesce(
+        models.Subquery(
+            queryset.order_by().annotate(
+                _count=models.Func(models.F('pk'), function='COUNT')
+            ).values('_count')
+        ),
+        0,
+    )
+
+
+class CaseQuerySet(models.QuerySet):
+    """Case query helpers"""
+    
+    def with_counts(self):
+        """Annotate evidence/parsed event totals used by CaseSerializer"""
+        return self.annotate(
+            evidence_total=count_subquery(
+                EvidenceFile.objects.filter(case=models.OuterRef('pk'))
+            ),
+            parsed_total=count_subquery(
+                ParsedEvent.objects.filter(evidence_file__case=models.OuterRef('pk'))
+            ),
+        )
+    
+    def with_report_data(self):
+        """Join the owner report builders print; evidence/stories are read as value rows"""
+        return self.select_related('created_by')
 
 
 class Case(models.Model):
@@ -25,11 +56,55 @@ class Case(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     closed_at = models.DateTimeField(null=True, blank=True)
     
+    # Denormalized ScoredEvent counters (O(1) summary reads)
+    total_events = models.IntegerField(default=0)
+    high_risk_events = models.IntegerField(default=0)
+    critical_events = models.IntegerField(default=0)
+    
+    objects = CaseQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
     
     def __str__(self):
         return f"{self.name} ({self.status})"
+    
+    def scored_events(self):
+        """All ScoredEvents belonging to this case"""
+        return ScoredEvent.objects.for_case(self)
+    
+    @classmethod
+    def touch(cls, case_id):
+        """Bump updated_at - the version stamp cached summaries are keyed on"""
+        cls.objects.filter(pk=case_id).update(updated_at=timezone.now())
+    
+    @classmethod
+    def refresh_event_counters(cls, case_id):
+        """
+        Recount denormalized ScoredEvent counters for a case
+        Call after bulk writes/deletes that bypass ScoredEvent.save()/delete()
+        """
+        counts = ScoredEvent.objects.for_case(case_id).aggregate(
+            total_events=models.Count('id'),
+            high_risk_events=models.Count('id', filter=models.Q(risk_label='HIGH')),
+            critical_events=models.Count('id', filter=models.Q(risk_label='CRITICAL')),
+        )
+        cls.objects.filter(pk=case_id).update(**counts, updated_at=timezone.now())
+
+
+class EvidenceFileQuerySet(models.QuerySet):
+    """Evidence file query helpers"""
+    
+    def with_counts(self):
+        """Annotate parsed/scored event totals used by EvidenceFileSerializer"""
+        return self.annotate(
+            parsed_total=count_subquery(
+                ParsedEvent.objects.filter(evidence_file=models.OuterRef('pk'))
+            ),
+            scored_total=count_subquery(
+                ScoredEvent.objects.filter(parsed_event__evidence_file=models.OuterRef('pk'))
+            ),
+        )
 
 
 class EvidenceFile(models.Model):
@@ -48,7 +123,7 @@ class EvidenceFile(models.Model):
     case = models.ForeignKey(Case, on_delete=models.CASCADE, related_name='evidence_files')
     filename = models.CharField(max_length=255)
     file = models.FileField(upload_to='evidence/%Y/%m/%d/')
-    file_hash = models.CharField(max_length=64, db_index=True)  # SHA-256 (not globally unique - same file can be in multiple cases)
+    file_hash = models.CharField(max_length=64)  # SHA-256 (not globally unique - same file can be in multiple cases)
     file_size = models.BigIntegerField()
     log_type = models.CharField(max_length=20, choices=LOG_TYPE_CHOICES, default='UNKNOWN')
     
@@ -60,13 +135,15 @@ class EvidenceFile(models.Model):
     parsed_at = models.DateTimeField(null=True, blank=True)
     parse_error = models.TextField(blank=True)
     
+    objects = EvidenceFileQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-uploaded_at']
         indexes = [
-            models.Index(fields=['file_hash']),
             models.Index(fields=['case', 'uploaded_at']),
         ]
         # Allow same file in different cases, but prevent duplicates within same case
+        # Hashes are only ever looked up per case, so this is the one index on file_hash
         constraints = [
             models.UniqueConstraint(fields=['case', 'file_hash'], name='unique_file_per_case')
         ]
@@ -82,20 +159,21 @@ class EvidenceFile(models.Model):
     
     def _calculate_hash(self):
         """Calculate SHA-256 hash of file"""
-        sha256_hash = hashlib.sha256()
-        for byte_block in iter(lambda: self.file.read(4096), b""):
-            sha256_hash.update(byte_block)
-        self.file.seek(0)  # Reset file pointer
-        return sha256_hash.hexdigest()
+        from .services.hashing import calculate_sha256
+        return calculate_sha256(self.file)
     
     @property
     def event_count(self):
         """Return number of parsed events"""
+        if hasattr(self, 'parsed_total'):
+            return self.parsed_total
         return self.parsed_events.count()
     
     @property
     def scored_event_count(self):
         """Return number of scored events"""
+        if hasattr(self, 'scored_total'):
+            return self.scored_total
         from .models import ScoredEvent
         return ScoredEvent.objects.filter(parsed_event__evidence_file=self).count()
 
@@ -133,6 +211,45 @@ class ParsedEvent(models.Model):
         return f"{self.timestamp} - {self.event_type}"
 
 
+# Longest raw_message excerpt the PDF/LaTeX/CSV report builders print (the CSV column)
+REPORT_MESSAGE_CHARS = 300
+
+
+class ScoredEventQuerySet(models.QuerySet):
+    """Shared case/user scoping for ScoredEvent queries"""
+    
+    def for_case(self, case):
+        """Events of one case (accepts a Case or its id)"""
+        return self.filter(parsed_event__evidence_file__case_id=getattr(case, 'pk', case))
+    
+    def for_user(self, user):
+        """Events across all cases owned by a user"""
+        return self.filter(parsed_event__evidence_file__case__created_by=user)
+    
+    def active(self):
+        """Events above the filter threshold (not archived)"""
+        return self.filter(is_archived=False)
+    
+    def report_rows(self, limit=500, message_chars=None):
+        """
+        Highest-confidence events as flat dicts for report builders (no model instances)
+        message_chars truncates raw_message in SQL, so long log lines never leave the DB
+        """
+        raw_message = models.F('parsed_event__raw_message')
+        if message_chars:
+            raw_message = Substr(raw_message, 1, message_chars)
+        return self.order_by('-confidence').values(
+            'confidence',
+            'risk_label',
+            'inference_text',
+            timestamp=models.F('parsed_event__timestamp'),
+            event_type=models.F('parsed_event__event_type'),
+            user=models.F('parsed_event__user'),
+            host=models.F('parsed_event__host'),
+            raw_message=raw_message,
+        )[:limit]
+
+
 class ScoredEvent(models.Model):
     """
     ML confidence-scored event
@@ -171,27 +288,102 @@ class ScoredEvent(models.Model):
     
     scored_at = models.DateTimeField(auto_now_add=True)
     
+    objects = ScoredEventQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-confidence', 'parsed_event__timestamp']
         indexes = [
+            # Covering index for case-scoped aggregates: they join on parsed_event and read only
+            # these columns, so Postgres can answer them with index-only scans. The unique
+            # parsed_event index finds the row but still needs a heap fetch per joined event
+            models.Index(fields=['parsed_event', 'is_archived', 'risk_label', 'confidence']),
+            # Filter apply/reset range-scan confidence in both archive states
             models.Index(fields=['confidence', 'is_archived']),
-            models.Index(fields=['risk_label', 'is_archived']),
+            # Risk-label counts only ever look at active events: index just those rows
+            models.Index(
+                fields=['risk_label'],
+                condition=models.Q(is_archived=False),
+                name='se_risk_active',
+            ),
         ]
     
     def __str__(self):
         return f"{self.risk_label} ({self.confidence:.2f}) - {self.parsed_event.event_type}"
     
+    # Fields that cached case summaries read; saving any of them bumps the case version
+    CASE_VERSION_FIELDS = {'risk_label', 'confidence', 'is_archived'}
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored label so save() can adjust case counters
+        # (DEFERRED when loaded via only()/defer() without it)
+        instance._loaded_risk_label = instance.__dict__.get('risk_label', models.DEFERRED)
+        return instance
+    
+    def _stored_risk_label(self):
+        """Label as last loaded/saved, read from the row if this instance never had it"""
+        label = getattr(self, '_loaded_risk_label', models.DEFERRED)
+        if label is models.DEFERRED:
+            label = ScoredEvent.objects.filter(pk=self.pk).values_list('risk_label', flat=True).first()
+        return label
+    
+    def save(self, *args, **kwargs):
+        """Keep the owning case's denormalized counters in sync"""
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        label_saved = update_fields is None or 'risk_label' in update_fields
+        old_label = None if adding or not label_saved else self._stored_risk_label()
+        super().save(*args, **kwargs)
+        
+        if adding:
+            self._update_case_counters(total=1, new_label=self.risk_label)
+        elif label_saved:
+            # Unchanged label still touches the case (archive state, scores)
+            self._update_case_counters(old_label=old_label, new_label=self.risk_label)
+        elif self.CASE_VERSION_FIELDS.intersection(update_fields):
+            # Counters unaffected; only bump the case version
+            self._update_case_counters()
+        if label_saved:
+            self._loaded_risk_label = self.risk_label
+    
+    def delete(self, *args, **kwargs):
+        label = self._stored_risk_label()
+        parsed_event_id = self.parsed_event_id
+        result = super().delete(*args, **kwargs)
+        self._update_case_counters(total=-1, old_label=label, parsed_event_id=parsed_event_id)
+        return result
+    
+    def _update_case_counters(self, total=0, old_label=None, new_label=None, parsed_event_id=None):
+        """
+        Apply counter deltas with F() expressions (no read-modify-write race)
+        Always bumps the case's updated_at so cached summaries are invalidated
+        """
+        label_fields = {'HIGH': 'high_risk_events', 'CRITICAL': 'critical_events'}
+        deltas = {}
+        if total:
+            deltas['total_events'] = total
+        if old_label in label_fields:
+            deltas[label_fields[old_label]] = deltas.get(label_fields[old_label], 0) - 1
+        if new_label in label_fields:
+            deltas[label_fields[new_label]] = deltas.get(label_fields[new_label], 0) + 1
+        updates = {field: models.F(field) + delta for field, delta in deltas.items() if delta}
+        
+        Case.objects.filter(
+            evidence_files__parsed_events__id=parsed_event_id or self.parsed_event_id
+        ).update(**updates, updated_at=timezone.now())
+    
     def archive(self):
         """Archive low-confidence event"""
         self.is_archived = True
         self.archived_at = timezone.now()
-        self.save()
+        self.save(update_fields=['is_archived', 'archived_at'])
     
     def restore(self):
         """Restore archived event"""
         self.is_archived = False
         self.archived_at = None
-        self.save()
+        self.save(update_fields=['is_archived', 'archived_at'])
 
 
 class StoryPattern(models.Model):
@@ -282,5 +474,45 @@ class Report(models.Model):
     class Meta:
         ordering = ['-generated_at']
     
+    CONTENT_TYPES = {
+        'PDF': 'application/pdf',
+        'PDF_LATEX': 'application/pdf',
+        'CSV': 'text/csv',
+        'JSON': 'application/json',
+    }
+    
     def __str__(self):
         return f"Report v{self.version} for {self.case.name} ({self.format})"
+    
+    @property
+    def content_type(self):
+        return self.CONTENT_TYPES.get(self.format, 'application/octet-stream')
+    
+    @property
+    def download_filename(self):
+        """Attachment filename (built from case_id, no Case fetch)"""
+        extension = self.format.lower() if self.format != 'PDF_LATEX' else 'pdf'
+        return f"report_case_{self.case_id}_v{self.version}.{extension}"
+
+
+class QueuedTask(models.Model):
+    """
+    Celery task queued through the API, owned by the user who queued it
+    Result/status endpoints only answer for task ids the caller owns
+    """
+    task_id = models.CharField(max_length=255, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='queued_tasks')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Task {self.task_id} for {self.user_id}"
+    
+    @classmethod
+    def record(cls, task_id, user):
+        """Remember who queued task_id"""
+        cls.objects.create(task_id=task_id, user=user)
+    
+    @classmethod
+    def owned_by(cls, task_id, user) -> bool:
+        """True if user queued task_id"""
+        return cls.objects.filter(task_id=task_id, user=user).exists()
@@ -3,7 +3,9 @@ Django REST Framework Serializers
 Converts models to/from JSON for API
 """
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 from django.contrib.auth.models import User
+from django.db import IntegrityError
 from .models import (
     Case, EvidenceFile, ParsedEvent, ScoredEvent,
     StoryPattern, InvestigationNote, Report
@@ -34,13 +36,15 @@ class CaseSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_evidence_count(self, obj):
+        # Annotated by CaseQuerySet.with_counts() on list/detail queries
+        if hasattr(obj, 'evidence_total'):
+            return obj.evidence_total
         return obj.evidence_files.count()
     
     def get_event_count(self, obj):
-        return sum(
-            evidence.parsed_events.count()
-            for evidence in obj.evidence_files.all()
-        )
+        if hasattr(obj, 'parsed_total'):
+            return obj.parsed_total
+        return ParsedEvent.objects.filter(evidence_file__case=obj).count()
 
 
 class EvidenceFileSerializer(serializers.ModelSerializer):
@@ -65,6 +69,16 @@ class EvidenceFileSerializer(serializers.ModelSerializer):
             'scored_event_count', 'processing_status'
         ]
     
+    def create(self, validated_data):
+        """Save the upload; a rejected INSERT removes the file it already stored"""
+        evidence = EvidenceFile(**validated_data)
+        try:
+            evidence.save()
+        except IntegrityError:
+            evidence.file.delete(save=False)
+            raise
+        return evidence
+    
     def get_event_count(self, obj):
         return obj.event_count
     
@@ -83,8 +97,14 @@ class EvidenceFileSerializer(serializers.ModelSerializer):
         
         if obj.is_parsed:
             status['parsing'] = 'completed'
-            if obj.event_count > 0:
-                if obj.scored_event_count > 0:
+            # Reuse with_counts() annotations when present, else cheap EXISTS probes
+            if hasattr(obj, 'parsed_total'):
+                has_events, has_scores = obj.parsed_total > 0, obj.scored_total > 0
+            else:
+                has_events = obj.parsed_events.exists()
+                has_scores = has_events and ScoredEvent.objects.filter(parsed_event__evidence_file=obj).exists()
+            if has_events:
+                if has_scores:
                     status['scoring'] = 'completed'
                     status['story_generation'] = 'ready'
                 else:
@@ -185,12 +205,15 @@ class ReportSerializer(serializers.ModelSerializer):
     """Report serializer"""
     generated_by = UserSerializer(read_only=True)
     file_path = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
+    download_filename = serializers.CharField(read_only=True)
     
     class Meta:
         model = Report
         fields = [
             'id', 'case', 'format', 'file', 'file_path', 'file_hash',
-            'generated_by', 'generated_at', 'version'
+            'generated_by', 'generated_at', 'version',
+            'download_url', 'download_filename'
         ]
         read_only_fields = ['id', 'file_hash', 'generated_at']
     
@@ -202,6 +225,12 @@ class ReportSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.file.url)
             return obj.file.url
         return None
+    
+    def get_download_url(self, obj):
+        """Return URL of the authenticated download endpoint"""
+        url = reverse('report-download', kwargs={'pk': obj.pk})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
 
 
 class DashboardSummarySerializer(serializers.Serializer):
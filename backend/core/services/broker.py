@@ -0,0 +1,38 @@
+"""
+Celery broker availability
+Publishing to a down broker blocks for its full retry timeout (seconds per request);
+a short, cached connection probe lets views go straight to their fallback instead
+"""
+import logging
+import time
+from celery import current_app
+
+logger = logging.getLogger(__name__)
+
+# Seconds a probe result is trusted before the broker is checked again
+PROBE_TTL = 30
+# Connection timeout for the probe itself
+PROBE_TIMEOUT = 0.5
+
+# (available, monotonic expiry) of the last probe
+_last_probe = (None, 0.0)
+
+
+def celery_available() -> bool:
+    """True if the Celery broker accepted a connection within the last PROBE_TTL seconds"""
+    global _last_probe
+    available, expires_at = _last_probe
+    now = time.monotonic()
+    if available is not None and now < expires_at:
+        return available
+    
+    try:
+        with current_app.connection_for_write(connect_timeout=PROBE_TIMEOUT) as connection:
+            connection.ensure_connection(max_retries=1, interval_start=0, interval_step=0, timeout=PROBE_TIMEOUT)
+        available = True
+    except Exception as e:
+        logger.warning(f"Celery broker unavailable: {e}")
+        available = False
+    
+    _last_probe = (available, now + PROBE_TTL)
+    return available
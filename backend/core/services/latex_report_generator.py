@@ -8,7 +8,9 @@ from pylatex.utils import NoEscape, bold
 from pylatex.package import Package
 from datetime import datetime
 from typing import Dict, List
+import functools
 import os
+import shutil
 import subprocess
 import tempfile
 import csv
@@ -16,9 +18,31 @@ import io
 import logging
 import requests
 import json
+import re
+from .llm_row_inference import strip_code_fences
 
 logger = logging.getLogger(__name__)
 
+# Markup known to need aux data from a previous pdflatex pass; such documents start with a
+# -draftmode pass (aux files only). The .log decides any further reruns
+_NEEDS_SECOND_PASS_RE = re.compile(
+    r'\\(?:tableofcontents|listof\w+|\w*ref|cite\w*)\b|\\begin\{longtable\}'
+    r'|\\usepackage(?:\[[^\]]*\])?\{[^}]*\b(?:hyperref|lastpage)\b'
+)
+# LaTeX, longtable, lastpage and rerunfilecheck all ask for another pass this way
+_RERUN_RE = re.compile(rb'Rerun (?:to get|LaTeX)')
+# Upper bound on pdflatex runs per document (draft pass included)
+MAX_LATEX_PASSES = 4
+
+
+@functools.cache
+def _pdflatex_available() -> bool:
+    """
+    PATH lookup in-process (no `which` fork), memoized - installs don't change at runtime
+    Module-level so the cache doesn't hold a reference to a generator instance
+    """
+    return shutil.which('pdflatex') is not None
+
 
 class LaTeXReportGenerator:
     """
@@ -98,15 +122,7 @@ Provide your analysis as JSON with these exact keys:
             )
             
             # Parse response
-            response_text = response.text.strip()
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]
-            if response_text.startswith('```'):
-                response_text = response_text[3:]
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]
-            
-            ai_data = json.loads(response_text.strip())
+            ai_data = json.loads(strip_code_fences(response.text))
             ai_data['generated_by'] = 'Gemini AI'
             ai_data['risk_counts'] = risk_counts
             return ai_data
@@ -359,7 +375,7 @@ Provide your analysis as JSON with these exact keys:
         pdf_bytes = self._compile_latex_to_pdf(latex_content)
         
         # Generate CSV data
-        csv_data = self._generate_report_csv(case_data)
+        csv_data = self.generate_report_csv(case_data)
         
         return latex_content, pdf_bytes, csv_data
     
@@ -518,9 +534,9 @@ Provide your analysis as JSON with these exact keys:
                 doc.append(f"{i}. {rec}")
                 doc.append(NoEscape(r'\\'))
     
-    def _generate_report_csv(self, case_data: Dict) -> str:
+    def generate_report_csv(self, case_data: Dict) -> str:
         """
-        Generate CSV export of report data
+        Generate CSV export of report data (no LaTeX or PDF work)
         
         Args:
             case_data: Dict containing case, evidence, events, stories
@@ -540,8 +556,9 @@ Provide your analysis as JSON with these exact keys:
         # Write events table
         writer.writerow(['Timestamp', 'Event Type', 'User', 'Host', 'Risk Level', 'Confidence', 'Description', 'Raw Message'])
         
-        for event in case_data['scored_events']:
-            writer.writerow([
+        # writerows over a generator: no per-row writerow call or intermediate list
+        writer.writerows(
+            (
                 event.get('timestamp', ''),
                 event.get('event_type', ''),
                 event.get('user', ''),
@@ -550,19 +567,23 @@ Provide your analysis as JSON with these exact keys:
                 f"{event.get('confidence', 0):.4f}",
                 (event.get('inference_text', 'N/A') or 'N/A')[:200],
                 (event.get('raw_message', '') or '')[:300]
-            ])
+            )
+            for event in case_data['scored_events']
+        )
         
         writer.writerow([])
         writer.writerow(['Attack Stories Summary'])
         writer.writerow(['Title', 'Attack Phase', 'Confidence', 'Narrative'])
         
-        for story in case_data['stories']:
-            writer.writerow([
+        writer.writerows(
+            (
                 story.get('title', ''),
                 story.get('attack_phase', ''),
                 f"{story.get('avg_confidence', 0):.4f}",
                 (story.get('narrative', '') or '')[:500]
-            ])
+            )
+            for story in case_data['stories']
+        )
         
         return csv_buffer.getvalue()
     
@@ -677,18 +698,13 @@ Provide your analysis as JSON with these exact keys:
     
     def _is_pdflatex_available(self) -> bool:
         """Check if pdflatex is installed and available"""
-        try:
-            result = subprocess.run(
-                ['which', 'pdflatex'],
-                capture_output=True,
-                timeout=5
-            )
-            return result.returncode == 0
-        except Exception:
-            return False
+        return _pdflatex_available()
     
-    def _compile_latex_online(self, latex_content: str) -> bytes:
-        """Compile LaTeX to PDF using online API (latexonline.cc)"""
+    def _compile_latex_online(self, latex_content: str, pdf_path: str = None) -> bytes:
+        """
+        Compile LaTeX to PDF using online API (latexonline.cc)
+        With pdf_path the PDF is streamed to that file instead of returned
+        """
         
         # Try latexonline.cc API
         try:
@@ -699,11 +715,17 @@ Provide your analysis as JSON with these exact keys:
                 url,
                 data={'text': latex_content},
                 timeout=60,
-                headers={'Accept': 'application/pdf'}
+                headers={'Accept': 'application/pdf'},
+                stream=pdf_path is not None
             )
             
             if response.status_code == 200 and response.headers.get('content-type', '').startswith('application/pdf'):
-                return response.content
+                if pdf_path is None:
+                    return response.content
+                with open(pdf_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        f.write(chunk)
+                return None
             else:
                 raise Exception(f"Online compilation failed: HTTP {response.status_code}")
         except requests.exceptions.Timeout:
@@ -728,31 +750,50 @@ Provide your analysis as JSON with these exact keys:
     def _compile_latex_local(self, latex_content: str) -> bytes:
         """Compile LaTeX to PDF using local pdflatex"""
         with tempfile.TemporaryDirectory() as tmpdir:
-            # Write LaTeX file
-            tex_path = os.path.join(tmpdir, 'report.tex')
-            with open(tex_path, 'w', encoding='utf-8') as f:
-                f.write(latex_content)
+            pdf_path = self._compile_latex_local_in(latex_content, tmpdir)
+            with open(pdf_path, 'rb') as f:
+                return f.read()
+    
+    def _compile_latex_local_in(self, latex_content: str, tmpdir: str) -> str:
+        """Run pdflatex inside tmpdir and return the path of the generated PDF"""
+        # Write LaTeX file
+        tex_path = os.path.join(tmpdir, 'report.tex')
+        with open(tex_path, 'w', encoding='utf-8') as f:
+            f.write(latex_content)
+        
+        # Compile with pdflatex, rerunning while the log asks for it; documents known to need
+        # aux data start with a -draftmode pass that only writes the aux files
+        log_path = os.path.join(tmpdir, 'report.log')
+        extra_args = ['-draftmode'] if _NEEDS_SECOND_PASS_RE.search(latex_content) else []
+        try:
+            for _ in range(MAX_LATEX_PASSES):
+                subprocess.run(
+                    ['pdflatex', '-interaction=nonstopmode', *extra_args, '-output-directory', tmpdir, tex_path],
+                    capture_output=True,
+                    timeout=30
+                )
+                if extra_args:
+                    extra_args = []
+                elif not self._log_requests_rerun(log_path):
+                    break
             
-            # Compile with pdflatex (run twice for TOC)
-            try:
-                for _ in range(2):
-                    subprocess.run(
-                        ['pdflatex', '-interaction=nonstopmode', '-output-directory', tmpdir, tex_path],
-                        capture_output=True,
-                        timeout=30
-                    )
-                
-                # Read PDF
-                pdf_path = os.path.join(tmpdir, 'report.pdf')
-                if os.path.exists(pdf_path):
-                    with open(pdf_path, 'rb') as f:
-                        return f.read()
-                else:
-                    raise Exception("PDF compilation failed - file not generated")
-            except subprocess.TimeoutExpired:
-                raise Exception("LaTeX compilation timeout")
-            except FileNotFoundError:
-                raise Exception("pdflatex not installed. Install with: sudo apt-get install texlive-latex-base texlive-fonts-recommended")
+            pdf_path = os.path.join(tmpdir, 'report.pdf')
+            if os.path.exists(pdf_path):
+                return pdf_path
+            else:
+                raise Exception("PDF compilation failed - file not generated")
+        except subprocess.TimeoutExpired:
+            raise Exception("LaTeX compilation timeout")
+        except FileNotFoundError:
+            raise Exception("pdflatex not installed. Install with: sudo apt-get install texlive-latex-base texlive-fonts-recommended")
+    
+    def _log_requests_rerun(self, log_path: str) -> bool:
+        """True if the last pdflatex run's log asks for another pass"""
+        try:
+            with open(log_path, 'rb') as f:
+                return _RERUN_RE.search(f.read()) is not None
+        except OSError:
+            return False
     
     def compile_custom_latex(self, latex_content: str) -> tuple:
         """
@@ -770,6 +811,33 @@ Provide your analysis as JSON with these exact keys:
         except Exception as e:
             return None, str(e)
     
+    def compile_custom_latex_to_file(self, latex_content: str) -> tuple:
+        """
+        Compile custom LaTeX content to a PDF on disk, never holding it in memory
+        
+        Args:
+            latex_content: User-edited LaTeX source code
+            
+        Returns:
+            tuple: (pdf_path: str or None, error_message: str or None)
+            The caller owns the PDF's temporary directory and must remove it
+        """
+        tmpdir = tempfile.mkdtemp(prefix='latex_')
+        try:
+            # Try local pdflatex first, then the online API
+            if self._is_pdflatex_available():
+                try:
+                    return self._compile_latex_local_in(latex_content, tmpdir), None
+                except Exception as local_error:
+                    logger.warning(f"Local pdflatex failed: {local_error}, trying online API")
+            
+            pdf_path = os.path.join(tmpdir, 'report.pdf')
+            self._compile_latex_online(latex_content, pdf_path=pdf_path)
+            return pdf_path, None
+        except Exception as e:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+            return None, str(e)
+    
     def generate_latex_preview(self, case_data: Dict) -> str:
         """
         Generate LaTeX source code without compiling (for preview/editing)
@@ -4,6 +4,10 @@ Provides technical one-sentence explanations for individual events
 """
 from typing import Optional
 import os
+import re
+
+# Markdown code fence (``` or ~~~, optional language tag) wrapped around a JSON reply
+_CODE_FENCE_RE = re.compile(r'\A(?:```|~~~)[\w-]*[ \t]*\n?|\n?[ \t]*(?:```|~~~)\Z')
 
 
 class LLMInferenceService:
@@ -115,6 +119,11 @@ Provide a concise, technical explanation of what this event means and why it mig
         return response.text
 
 
+def strip_code_fences(text: str) -> str:
+    """LLM reply with surrounding whitespace and a markdown code fence removed"""
+    return _CODE_FENCE_RE.sub('', text.strip()).strip()
+
+
 # Singleton instance
 def get_llm_service() -> LLMInferenceService:
     """Get configured LLM service instance"""
@@ -6,13 +6,14 @@ import os
 from typing import Optional
 
 
-def detect_log_type(file_path: str, filename: str) -> str:
+def detect_log_type(file_path: str, filename: str, header: Optional[bytes] = None) -> str:
     """
     Detect log file type based on extension and content
     
     Args:
         file_path: Path to file
         filename: Original filename
+        header: Leading bytes captured during upload; skips reopening the file
         
     Returns:
         Log type string: CSV, SYSLOG, EVTX, JSON, or UNKNOWN
@@ -26,56 +27,56 @@ def detect_log_type(file_path: str, filename: str) -> str:
         return 'EVTX'
     elif extension == '.json':
         return 'JSON'
-    elif extension in ['.log', '.txt']:
+    
+    # Content checks only look at the first line - read it once
+    first_line = _first_line(file_path, header)
+    
+    if extension in ['.log', '.txt']:
         # Try to detect access log format first
-        if _is_access_log_format(file_path):
+        if _is_access_log_format(first_line):
             return 'ACCESS_LOG'
         # Try to detect syslog format
-        if _is_syslog_format(file_path):
+        if _is_syslog_format(first_line):
             return 'SYSLOG'
     
     # Fallback: Try to parse as CSV
-    if _is_csv_format(file_path):
+    if _is_csv_format(first_line):
         return 'CSV'
     
     return 'UNKNOWN'
 
 
-def _is_csv_format(file_path: str) -> bool:
-    """Check if file looks like CSV"""
+def _first_line(file_path: str, header: Optional[bytes] = None) -> str:
+    """First line of the file, from the upload header when available"""
+    if header is not None:
+        return header.decode('utf-8', errors='ignore').split('\n', 1)[0]
     try:
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            first_line = f.readline()
-            # Simple heuristic: contains commas and no weird characters
-            return ',' in first_line and first_line.count(',') >= 2
+            return f.readline()
     except Exception:
-        return False
+        return ''
+
+
+def _is_csv_format(first_line: str) -> bool:
+    """Check if file looks like CSV"""
+    # Simple heuristic: contains commas and no weird characters
+    return ',' in first_line and first_line.count(',') >= 2
 
 
-def _is_syslog_format(file_path: str) -> bool:
+def _is_syslog_format(first_line: str) -> bool:
     """Check if file looks like syslog"""
-    try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            first_line = f.readline()
-            # Syslog typically starts with date/time pattern
-            # Simple heuristic: look for common syslog patterns
-            syslog_indicators = ['<', '>', 'kernel:', 'syslog', 'daemon']
-            return any(indicator in first_line.lower() for indicator in syslog_indicators)
-    except Exception:
-        return False
+    # Syslog typically starts with date/time pattern
+    # Simple heuristic: look for common syslog patterns
+    syslog_indicators = ['<', '>', 'kernel:', 'syslog', 'daemon']
+    return any(indicator in first_line.lower() for indicator in syslog_indicators)
 
 
-def _is_access_log_format(file_path: str) -> bool:
+def _is_access_log_format(first_line: str) -> bool:
     """Check if file looks like Apache/Nginx access log"""
     import re
-    try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            first_line = f.readline()
-            # Access logs typically have IP, timestamp in brackets, HTTP method
-            # Pattern: IP - user [timestamp] "METHOD /path HTTP/x.x" status size
-            access_pattern = re.compile(
-                r'^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\s+.*\[.*\]\s+"(GET|POST|PUT|DELETE|HEAD|OPTIONS|PATCH)'
-            )
-            return bool(access_pattern.match(first_line))
-    except Exception:
-        return False
+    # Access logs typically have IP, timestamp in brackets, HTTP method
+    # Pattern: IP - user [timestamp] "METHOD /path HTTP/x.x" status size
+    access_pattern = re.compile(
+        r'^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\s+.*\[.*\]\s+"(GET|POST|PUT|DELETE|HEAD|OPTIONS|PATCH)'
+    )
+    return bool(access_pattern.match(first_line))
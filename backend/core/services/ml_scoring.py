@@ -3,7 +3,7 @@ ML Confidence Scoring Service
 Implements rule-based + ML hybrid scoring (MVP-friendly)
 Generates confidence scores (0.0-1.0) and risk labels
 """
-from typing import Dict, Tuple
+from typing import Dict, Iterable, List, Tuple
 from datetime import datetime
 import re
 
@@ -95,6 +95,49 @@ class MLScorer:
         
         return confidence, risk_label, feature_scores
     
+    def score_batch(self, events: Iterable[Dict]) -> List[Tuple[float, str, Dict[str, float]]]:
+        """
+        Score many events in one pass (same results as score_event per item)
+        Event type, user and message keyword scores are memoized for the batch -
+        logs repeat all three heavily, and the keyword scan is the costly part
+        
+        Args:
+            events: Iterable of event_data dicts (see score_event)
+            
+        Returns:
+            List of (confidence, risk_label, feature_scores), in input order
+        """
+        event_type_scores = {}
+        user_scores = {}
+        keyword_scores = {}
+        results = []
+        
+        for event_data in events:
+            event_type = event_data['event_type']
+            if event_type not in event_type_scores:
+                event_type_scores[event_type] = self._score_event_type(event_type)
+            
+            user = event_data.get('user', '')
+            if user not in user_scores:
+                user_scores[user] = self._score_user(user)
+            
+            raw_message = event_data['raw_message']
+            if raw_message not in keyword_scores:
+                keyword_scores[raw_message] = self._score_keywords(raw_message)
+            
+            feature_scores = {
+                'event_type': event_type_scores[event_type],
+                'keywords': keyword_scores[raw_message],
+                'user': user_scores[user],
+                'temporal': self._score_temporal(event_data.get('timestamp')),
+            }
+            
+            # Normalize to 0.0-1.0
+            confidence = min(sum(feature_scores.values()), 1.0)
+            results.append((confidence, self._assign_risk_label(confidence), feature_scores))
+        
+        return results
+    
     def _score_event_type(self, event_type: str) -> float:
         """Score based on event type"""
         event_type_lower = event_type.lower()
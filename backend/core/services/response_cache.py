@@ -0,0 +1,120 @@
+"""
+Response caching service
+Per-user cache keys versioned by Case.updated_at, plus ETag revalidation
+"""
+import hashlib
+import json
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+# Try to import orjson for faster rendering, fallback to standard json
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Safety net for writes that don't touch Case.updated_at
+SUMMARY_CACHE_TTL = 30
+# Closed cases are effectively frozen; any later write still bumps updated_at (new key)
+CLOSED_CASE_CACHE_TTL = 24 * 60 * 60
+# LLM analyses cost seconds and tokens; keyed on the case version, so a new write still misses
+AI_ANALYSIS_CACHE_TTL = 60 * 60
+
+
+def case_cache_ttl(case_status) -> int:
+    """Cache lifetime for a case's derived data"""
+    return CLOSED_CASE_CACHE_TTL if case_status == 'CLOSED' else SUMMARY_CACHE_TTL
+
+
+def dashboard_version(user) -> str:
+    """
+    Version stamp for a user's dashboard
+    Changes when a case is added/removed or any case's updated_at is bumped
+    """
+    from ..models import Case
+    
+    stats = Case.objects.filter(created_by=user).aggregate(
+        count=Count('id'),
+        latest=Max('updated_at'),
+    )
+    latest = stats['latest'].timestamp() if stats['latest'] else 0
+    return f"{stats['count']}:{latest}"
+
+
+def make_etag(*parts) -> str:
+    """Quoted strong ETag from version parts"""
+    digest = hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def not_modified(request, etag, last_modified=None):
+    """
+    304 response if the client's validators match, else None
+    If-None-Match wins when present; If-Modified-Since is only checked without it
+    """
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        if etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return cached_response(None, etag, status.HTTP_304_NOT_MODIFIED, last_modified)
+        return None
+    
+    if last_modified is not None:
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        if if_modified_since is not None and int(last_modified.timestamp()) <= if_modified_since:
+            return cached_response(None, etag, status.HTTP_304_NOT_MODIFIED, last_modified)
+    return None
+
+
+def _validator_headers(etag, last_modified=None) -> dict:
+    headers = {'ETag': etag}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified.timestamp())
+    return headers
+
+
+def cached_response(data, etag, status_code=status.HTTP_200_OK, last_modified=None):
+    """Response carrying the validators; varies on Authorization since data is per-user"""
+    response = Response(data, status=status_code, headers=_validator_headers(etag, last_modified))
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def render_json(data) -> bytes:
+    """Encode data as JSON bytes (datetimes as ISO 8601 with a Z suffix, like DRF)"""
+    if HAS_ORJSON:
+        return orjson.dumps(data, option=orjson.OPT_UTC_Z)
+    return json.dumps(data, cls=JSONEncoder, separators=(',', ':')).encode()
+
+
+def cached_json_response(body: bytes, etag, last_modified=None):
+    """Pre-rendered JSON response carrying the validators; skips DRF rendering entirely"""
+    response = HttpResponse(
+        body, content_type='application/json', headers=_validator_headers(etag, last_modified)
+    )
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+# Characters of a streamed string value encoded per chunk
+STREAM_CHUNK_CHARS = 64 * 1024
+
+
+def stream_json(text_key: str, text: str, fields: dict):
+    """
+    Yield a JSON object whose large string value is encoded chunk by chunk
+    Avoids holding a second, fully rendered copy of the text next to the original
+    """
+    yield b'{' + render_json(text_key) + b':"'
+    for start in range(0, len(text), STREAM_CHUNK_CHARS):
+        # A str slice never splits a code point, so each piece escapes on its own
+        yield json.dumps(text[start:start + STREAM_CHUNK_CHARS])[1:-1].encode()
+    yield b'"'
+    for key, value in fields.items():
+        yield b',' + render_json(key) + b':' + render_json(value)
+    yield b'}'
@@ -0,0 +1,71 @@
+"""
+Streaming ZIP writer
+Yields archive bytes as entries are compressed, so downloads start immediately
+"""
+import time
+import zipfile
+from typing import Iterable, Iterator, Optional, Tuple
+
+# Bytes fed to the compressor (and roughly yielded) per step
+CHUNK_SIZE = 64 * 1024
+
+
+class _ChunkSink:
+    """
+    Write-only, unseekable file object that buffers zipfile output until drained
+    zipfile falls back to data descriptors for unseekable targets
+    """
+    
+    def __init__(self):
+        self._chunks = []
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(
+    entries: Iterable[Tuple[str, bytes, int, Optional[int]]],
+) -> Iterator[bytes]:
+    """
+    Build a ZIP archive chunk by chunk
+    Use ZIP_STORED for already-compressed payloads (PDF, gz, zip) - deflating them is wasted CPU
+    
+    Args:
+        entries: (arcname, data, compress_type, compresslevel) tuples; compresslevel None keeps the zlib default
+    
+    Yields:
+        bytes: Consecutive pieces of the archive
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w') as zip_file:
+        for name, data, compress_type, compresslevel in entries:
+            # Stamp the current time, as writestr() would (open() by name leaves 1980)
+            info = zipfile.ZipInfo(name, date_time=time.localtime(time.time())[:6])
+            info.compress_type = compress_type
+            if compresslevel is not None:
+                # writestr() is the only public way to set a per-entry level
+                zip_file.writestr(info, data, compresslevel=compresslevel)
+            else:
+                view = memoryview(data)
+                with zip_file.open(info, 'w') as dest:
+                    for start in range(0, len(view), CHUNK_SIZE):
+                        dest.write(view[start:start + CHUNK_SIZE])
+                        chunk = sink.drain()
+                        if chunk:
+                            yield chunk
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    # Central directory
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
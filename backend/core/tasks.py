@@ -3,12 +3,55 @@ Celery background tasks
 Handles async processing: parsing, scoring, LLM inference, story synthesis, reporting
 """
 from celery import shared_task
+from django.db import transaction
 from django.utils import timezone
 from django.conf import settings
+from itertools import islice
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+PARSE_BATCH_SIZE = 1000
+
+
+def save_parsed_events(evidence, events, batch_size=PARSE_BATCH_SIZE):
+    """
+    Insert parser output for an evidence file with batched bulk_create
+    Runs in one transaction, so a failed parse leaves no partial rows behind
+    
+    Returns:
+        Number of events saved
+    """
+    from .models import ParsedEvent
+    
+    parsed_events = []
+    saved = 0
+    with transaction.atomic():
+        for event_data in events:
+            # Ensure extra_data is never None (safeguard against parser bugs)
+            if 'extra_data' not in event_data or event_data['extra_data'] is None:
+                event_data['extra_data'] = {}
+            
+            parsed_events.append(ParsedEvent(
+                evidence_file=evidence,
+                **event_data
+            ))
+            
+            # Bulk insert in batches
+            if len(parsed_events) >= batch_size:
+                ParsedEvent.objects.bulk_create(parsed_events, batch_size=batch_size)
+                saved += len(parsed_events)
+                logger.info(f"Saved {len(parsed_events)} events to database")
+                parsed_events = []
+        
+        # Save remaining events
+        if parsed_events:
+            ParsedEvent.objects.bulk_create(parsed_events, batch_size=batch_size)
+            saved += len(parsed_events)
+            logger.info(f"Saved final {len(parsed_events)} events to database")
+    return saved
+
 
 @shared_task
 def parse_evidence_file_task(evidence_file_id):
@@ -18,7 +61,7 @@ def parse_evidence_file_task(evidence_file_id):
     Args:
         evidence_file_id: EvidenceFile ID to parse
     """
-    from .models import EvidenceFile, ParsedEvent
+    from .models import EvidenceFile, Case
     from .services.parsers.factory import ParserFactory
     
     try:
@@ -29,48 +72,34 @@ def parse_evidence_file_task(evidence_file_id):
         
         if not parser:
             evidence.parse_error = f"No parser available for log type: {evidence.log_type}"
-            evidence.save()
+            evidence.save(update_fields=['parse_error'])
             return
         
         logger.info(f"Starting to parse {evidence.filename} ({evidence.file_size / 1024:.2f} KB)")
         
-        # Parse file
+        # Parse file (phases are timed so logs show whether parsing or inserts dominate)
+        started = time.perf_counter()
         events = parser.parse(evidence.file.path)
+        parse_seconds = time.perf_counter() - started
         
-        logger.info(f"Parsed {len(events)} events, now saving to database...")
+        logger.info(f"Parsed {len(events)} events in {parse_seconds:.2f}s, now saving to database...")
         
         # Save parsed events using bulk_create for better performance
-        batch_size = 1000
-        parsed_events = []
-        
-        for event_data in events:
-            # Ensure extra_data is never None (safeguard against parser bugs)
-            if 'extra_data' not in event_data or event_data['extra_data'] is None:
-                event_data['extra_data'] = {}
-            
-            parsed_events.append(ParsedEvent(
-                evidence_file=evidence,
-                **event_data
-            ))
-            
-            # Bulk insert in batches
-            if len(parsed_events) >= batch_size:
-                ParsedEvent.objects.bulk_create(parsed_events, batch_size=batch_size)
-                logger.info(f"Saved {len(parsed_events)} events to database")
-                parsed_events = []
-        
-        # Save remaining events
-        if parsed_events:
-            ParsedEvent.objects.bulk_create(parsed_events, batch_size=batch_size)
-            logger.info(f"Saved final {len(parsed_events)} events to database")
+        started = time.perf_counter()
+        save_parsed_events(evidence, events)
+        insert_seconds = time.perf_counter() - started
         
         # Mark as parsed
         evidence.is_parsed = True
         evidence.parsed_at = timezone.now()
         evidence.parse_error = ''
-        evidence.save()
+        evidence.save(update_fields=['is_parsed', 'parsed_at', 'parse_error'])
+        Case.touch(evidence.case_id)
         
-        logger.info(f"Successfully completed parsing {len(events)} events from {evidence.filename}")
+        logger.info(
+            f"Successfully completed parsing {len(events)} events from {evidence.filename} "
+            f"({evidence.log_type}: parse {parse_seconds:.2f}s, insert {insert_seconds:.2f}s)"
+        )
         
         # Trigger bulk ML scoring for all parsed events
         logger.info(f"Triggering bulk ML scoring for {len(events)} events...")
@@ -82,7 +111,123 @@ def parse_evidence_file_task(evidence_file_id):
         if evidence_file_id:
             evidence = EvidenceFile.objects.get(id=evidence_file_id)
             evidence.parse_error = str(e)
-            evidence.save()
+            evidence.save(update_fields=['parse_error'])
+
+
+SCORE_BATCH_SIZE = 1000
+
+
+def _inference_text(parsed_event, confidence):
+    """Basic inference text from confidence band"""
+    event_type = parsed_event.event_type or 'unknown'
+    user = parsed_event.user or 'unknown user'
+    host = parsed_event.host or 'unknown host'
+    
+    if confidence >= 0.8:
+        return f"Critical {event_type} activity detected from {user} on {host}"
+    elif confidence >= 0.6:
+        return f"High-risk {event_type} detected: {user}@{host}"
+    elif confidence >= 0.3:
+        return f"Suspicious {event_type} activity: {user}@{host}"
+    return f"Normal {event_type} event: {user}@{host}"
+
+
+def _score_parsed_events(parsed_events, recalculate=False, batch_size=SCORE_BATCH_SIZE):
+    """
+    Score a ParsedEvent queryset with batched bulk_create/bulk_update
+    
+    Args:
+        parsed_events: ParsedEvent queryset (select_related('scored') when recalculating)
+        recalculate: If True, update existing scores in place
+    
+    Returns:
+        Number of events scored
+    """
+    from .models import ScoredEvent
+    from .services.ml_scoring import scorer
+    
+    update_fields = ['confidence', 'risk_label', 'feature_scores', 'inference_text']
+    processed = 0
+    # Seconds spent per phase, logged at the end
+    read_seconds = score_seconds = write_seconds = 0.0
+    
+    # Load only the columns scoring reads - extra_data in particular can be large
+    fields = ['id', 'timestamp', 'user', 'host', 'event_type', 'raw_message']
+    if recalculate:
+        fields.append('scored')
+    events = parsed_events.only(*fields).iterator(chunk_size=batch_size)
+    while True:
+        started = time.perf_counter()
+        batch = list(islice(events, batch_size))
+        read_seconds += time.perf_counter() - started
+        if not batch:
+            break
+        
+        started = time.perf_counter()
+        event_data = [
+            {
+                'timestamp': parsed_event.timestamp,
+                'user': parsed_event.user or '',
+                'host': parsed_event.host or '',
+                'event_type': parsed_event.event_type or 'unknown',
+                'raw_message': parsed_event.raw_message or '',
+            }
+            for parsed_event in batch
+        ]
+        try:
+            # Score the whole batch in one call
+            scored = list(zip(batch, scorer.score_batch(event_data)))
+        except Exception as batch_error:
+            # Rescore one at a time so only the failing events are dropped
+            logger.warning(f"Batch scoring failed for events {batch[0].id}-{batch[-1].id}: {batch_error}")
+            scored = []
+            for parsed_event, data in zip(batch, event_data):
+                try:
+                    scored.append((parsed_event, scorer.score_event(data)))
+                except Exception as event_error:
+                    logger.error(f"Failed to score event {parsed_event.id}: {event_error}")
+        
+        scored_events_to_create = []
+        scored_events_to_update = []
+        for parsed_event, (confidence, risk_label, feature_scores) in scored:
+            inference_text = _inference_text(parsed_event, confidence)
+            
+            # Prepare for bulk create/update
+            if recalculate and hasattr(parsed_event, 'scored'):
+                scored_event = parsed_event.scored
+                scored_event.confidence = confidence
+                scored_event.risk_label = risk_label
+                scored_event.feature_scores = feature_scores
+                scored_event.inference_text = inference_text
+                scored_events_to_update.append(scored_event)
+            else:
+                scored_events_to_create.append(ScoredEvent(
+                    parsed_event=parsed_event,
+                    confidence=confidence,
+                    risk_label=risk_label,
+                    feature_scores=feature_scores,
+                    inference_text=inference_text
+                ))
+        score_seconds += time.perf_counter() - started
+        
+        # One bulk insert/update per batch
+        started = time.perf_counter()
+        if scored_events_to_create:
+            ScoredEvent.objects.bulk_create(scored_events_to_create, batch_size=batch_size)
+            logger.info(f"Bulk created {len(scored_events_to_create)} scored events")
+        
+        if scored_events_to_update:
+            ScoredEvent.objects.bulk_update(scored_events_to_update, update_fields, batch_size=batch_size)
+            logger.info(f"Bulk updated {len(scored_events_to_update)} scored events")
+        write_seconds += time.perf_counter() - started
+        
+        processed += len(scored)
+    
+    logger.info(
+        f"Scored {processed} events: read {read_seconds:.2f}s, "
+        f"score {score_seconds:.2f}s, write {write_seconds:.2f}s"
+    )
+    return processed
 
 
 @shared_task
@@ -148,109 +293,30 @@ def score_events_bulk_task(case_id, threshold=0.0, recalculate=False):
         recalculate: If True, recalculate existing scores
     """
     from .models import ParsedEvent, ScoredEvent, Case
-    from .services.ml_scoring import scorer
     
     try:
         # Get all parsed events for this case
         parsed_events = ParsedEvent.objects.filter(
             evidence_file__case_id=case_id
-        ).select_related('evidence_file')
+        )
         
-        total_events = parsed_events.count()
-        logger.info(f"Starting bulk scoring for {total_events} events in case {case_id}")
+        # No COUNT(*) up front just for logging - the helper reports how many it processed
+        logger.info(f"Starting bulk scoring for case {case_id} (recalculate={recalculate})")
         
-        # Filter out already scored events if not recalculating
-        if not recalculate:
-            already_scored_ids = ScoredEvent.objects.filter(
-                parsed_event__evidence_file__case_id=case_id
-            ).values_list('parsed_event_id', flat=True)
-            parsed_events = parsed_events.exclude(id__in=already_scored_ids)
-            logger.info(f"Skipping {len(already_scored_ids)} already scored events")
+        if recalculate:
+            # Join existing scores so the loop doesn't hit the DB per event
+            parsed_events = parsed_events.select_related('scored')
+        else:
+            # Filter out already scored events (evaluated as a SQL subquery)
+            already_scored = ScoredEvent.objects.for_case(case_id)
+            parsed_events = parsed_events.exclude(
+                id__in=already_scored.values_list('parsed_event_id', flat=True)
+            )
         
-        # Batch process events
-        batch_size = 1000
-        scored_events_to_create = []
-        scored_events_to_update = []
-        processed = 0
-        
-        for parsed_event in parsed_events.iterator(chunk_size=batch_size):
-            try:
-                # Prepare event data for scoring
-                event_data = {
-                    'timestamp': parsed_event.timestamp,
-                    'user': parsed_event.user or '',
-                    'host': parsed_event.host or '',
-                    'event_type': parsed_event.event_type or 'unknown',
-                    'raw_message': parsed_event.raw_message or '',
-                }
-                
-                # Score event
-                confidence, risk_label, feature_scores = scorer.score_event(event_data)
-                
-                # Generate basic inference text
-                event_type = parsed_event.event_type or 'unknown'
-                user = parsed_event.user or 'unknown user'
-                host = parsed_event.host or 'unknown host'
-                
-                if confidence >= 0.8:
-                    inference_text = f"Critical {event_type} activity detected from {user} on {host}"
-                elif confidence >= 0.6:
-                    inference_text = f"High-risk {event_type} detected: {user}@{host}"
-                elif confidence >= 0.3:
-                    inference_text = f"Suspicious {event_type} activity: {user}@{host}"
-                else:
-                    inference_text = f"Normal {event_type} event: {user}@{host}"
-                
-                # Prepare for bulk create/update
-                if recalculate and hasattr(parsed_event, 'scored'):
-                    scored_event = parsed_event.scored
-                    scored_event.confidence = confidence
-                    scored_event.risk_label = risk_label
-                    scored_event.feature_scores = feature_scores
-                    scored_event.inference_text = inference_text
-                    scored_events_to_update.append(scored_event)
-                else:
-                    scored_events_to_create.append(ScoredEvent(
-                        parsed_event=parsed_event,
-                        confidence=confidence,
-                        risk_label=risk_label,
-                        feature_scores=feature_scores,
-                        inference_text=inference_text
-                    ))
-                
-                processed += 1
-                
-                # Bulk insert/update in batches
-                if len(scored_events_to_create) >= batch_size:
-                    ScoredEvent.objects.bulk_create(scored_events_to_create, batch_size=batch_size)
-                    logger.info(f"Bulk created {len(scored_events_to_create)} scored events")
-                    scored_events_to_create = []
-                
-                if len(scored_events_to_update) >= batch_size:
-                    ScoredEvent.objects.bulk_update(
-                        scored_events_to_update,
-                        ['confidence', 'risk_label', 'feature_scores', 'inference_text'],
-                        batch_size=batch_size
-                    )
-                    logger.info(f"Bulk updated {len(scored_events_to_update)} scored events")
-                    scored_events_to_update = []
-                    
-            except Exception as event_error:
-                logger.error(f"Failed to score event {parsed_event.id}: {event_error}")
-                continue
+        processed = _score_parsed_events(parsed_events, recalculate=recalculate)
         
-        # Save remaining events
-        if scored_events_to_create:
-            ScoredEvent.objects.bulk_create(scored_events_to_create, batch_size=batch_size)
-            logger.info(f"Bulk created final {len(scored_events_to_create)} scored events")
-        
-        if scored_events_to_update:
-            ScoredEvent.objects.bulk_update(
-                scored_events_to_update,
-                ['confidence', 'risk_label', 'feature_scores', 'inference_text'],
-                batch_size=batch_size
-            )
-            logger.info(f"Bulk updated final {len(scored_events_to_update)} scored events")
+        # bulk_create/bulk_update bypass ScoredEvent.save(), so recount once here
+        Case.refresh_event_counters(case_id)
         
         logger.info(f"Successfully bulk scored {processed} events for case {case_id}")
         
@@ -295,7 +361,7 @@ def generate_llm_explanation_task(scored_event_id):
         scored_event.inference_text = explanation
         scored_event.inference_generated_at = timezone.now()
         scored_event.inference_model = llm_service.model
-        scored_event.save()
+        scored_event.save(update_fields=['inference_text', 'inference_generated_at', 'inference_model'])
         
         logger.info(f"Generated explanation for event {scored_event_id}")
         
@@ -319,10 +385,8 @@ def generate_story_task(case_id, story_id=None):
         case = Case.objects.get(id=case_id)
         
         # Get high-confidence events
-        high_conf_events = ScoredEvent.objects.filter(
-            parsed_event__evidence_file__case=case,
-            confidence__gte=settings.ML_CONFIDENCE_THRESHOLD,
-            is_archived=False
+        high_conf_events = ScoredEvent.objects.for_case(case).active().filter(
+            confidence__gte=settings.ML_CONFIDENCE_THRESHOLD
         ).select_related('parsed_event').order_by('parsed_event__timestamp')
         
         if not high_conf_events.exists():
@@ -356,7 +420,10 @@ def generate_story_task(case_id, story_id=None):
             story.event_count = story_data['event_count']
             story.time_span_start = story_data['time_span_start']
             story.time_span_end = story_data['time_span_end']
-            story.save()
+            story.save(update_fields=[
+                'title', 'narrative_text', 'attack_phase', 'avg_confidence',
+                'event_count', 'time_span_start', 'time_span_end',
+            ])
         else:
             story = StoryPattern.objects.create(
                 case=case,
@@ -372,6 +439,7 @@ def generate_story_task(case_id, story_id=None):
         
         # Link events to story
         story.scored_events.set(high_conf_events)
+        Case.touch(case.id)
         
         logger.info(f"Generated story for case {case_id}: {story.title}")
         
@@ -389,15 +457,18 @@ def generate_report_task(case_id, format='PDF', user_id=None, include_llm_explan
         format: Report format (PDF, PDF_LATEX, CSV, or JSON)
         user_id: User ID generating report
         include_llm_explanations: Whether to include LLM explanations in report
+    
+    Returns:
+        {'report_id': id} or {'error': message} (JSON-safe for the result backend)
     """
-    from .models import Case, Report, User, ScoredEvent
+    from .models import Case, Report, User, ScoredEvent, REPORT_MESSAGE_CHARS
     from .services.report_generator import report_generator
     from .services.hashing import calculate_string_hash
     from django.core.files.base import ContentFile
     import json
     
     try:
-        case = Case.objects.get(id=case_id)
+        case = Case.objects.with_report_data().get(id=case_id)
         user = User.objects.get(id=user_id) if user_id else None
         
         # Gather case data
@@ -415,41 +486,46 @@ def generate_report_task(case_id, format='PDF', user_id=None, include_llm_explan
         }
         
         # Evidence files
-        for evidence in case.evidence_files.all():
+        evidence_rows = case.evidence_files.values(
+            'filename', 'file_hash', 'uploaded_at', 'uploaded_by__username'
+        )
+        for evidence in evidence_rows:
             case_data['evidence_files'].append({
-                'filename': evidence.filename,
-                'file_hash': evidence.file_hash,
-                'uploaded_at': evidence.uploaded_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'uploaded_by': evidence.uploaded_by.username,
+                'filename': evidence['filename'],
+                'file_hash': evidence['file_hash'],
+                'uploaded_at': evidence['uploaded_at'].strftime('%Y-%m-%d %H:%M:%S'),
+                'uploaded_by': evidence['uploaded_by__username'],
             })
         
-        # Scored events - ALL real data from parsed logs
-        scored_events = ScoredEvent.objects.filter(
-            parsed_event__evidence_file__case=case,
-            is_archived=False
-        ).select_related('parsed_event', 'parsed_event__evidence_file').order_by('-confidence')[:500]
-        
-        logger.info(f"Generating report with {scored_events.count()} real parsed events")
+        # Scored events - ALL real data from parsed logs (JSON exports keep full messages)
+        scored_events = ScoredEvent.objects.for_case(case).active().report_rows(
+            500, message_chars=None if format == 'JSON' else REPORT_MESSAGE_CHARS
+        )
         
-        for event in scored_events:
+        for event in scored_events.iterator(chunk_size=200):
             case_data['scored_events'].append({
-                'timestamp': event.parsed_event.timestamp,
-                'event_type': event.parsed_event.event_type or 'UNKNOWN',
-                'user': event.parsed_event.user or 'N/A',
-                'host': event.parsed_event.host or 'N/A',
-                'confidence': float(event.confidence),
-                'risk_label': event.risk_label or 'UNKNOWN',
-                'inference_text': event.inference_text if include_llm_explanations else '',
-                'raw_message': event.parsed_event.raw_message or '',
+                'timestamp': event['timestamp'],
+                'event_type': event['event_type'] or 'UNKNOWN',
+                'user': event['user'] or 'N/A',
+                'host': event['host'] or 'N/A',
+                'confidence': float(event['confidence']),
+                'risk_label': event['risk_label'] or 'UNKNOWN',
+                'inference_text': event['inference_text'] if include_llm_explanations else '',
+                'raw_message': event['raw_message'] or '',
             })
         
+        logger.info(f"Generating report with {len(case_data['scored_events'])} real parsed events")
+        
         # Story patterns
-        for story in case.story_patterns.all():
+        story_rows = case.story_patterns.values(
+            'title', 'narrative_text', 'attack_phase', 'avg_confidence'
+        )
+        for story in story_rows:
             case_data['stories'].append({
-                'title': story.title,
-                'narrative': story.narrative_text,
-                'attack_phase': story.attack_phase,
-                'avg_confidence': story.avg_confidence,
+                'title': story['title'],
+                'narrative': story['narrative_text'],
+                'attack_phase': story['attack_phase'],
+                'avg_confidence': story['avg_confidence'],
             })
         
         # Generate report based on format
@@ -467,8 +543,8 @@ def generate_report_task(case_id, format='PDF', user_id=None, include_llm_explan
         elif format == 'CSV':
             from .services.latex_report_generator import latex_generator
             filename = f"report_case_{case.id}.csv"
-            # Generate CSV from nested report generator
-            _, _, csv_data = latex_generator.generate_nested_latex_report(case_data)
+            # CSV only - skip the AI summary and PDF compile of the full report
+            csv_data = latex_generator.generate_report_csv(case_data)
             file_content = ContentFile(csv_data.encode('utf-8'), name=filename)
             file_hash = calculate_string_hash(csv_data)
         elif format == 'JSON':
@@ -491,10 +567,72 @@ def generate_report_task(case_id, format='PDF', user_id=None, include_llm_explan
             generated_by=user or case.created_by,
             version=version,
         )
+        # FieldFile.save() already saves the instance
         report.file.save(filename, file_content)
-        report.save()
         
         logger.info(f"Generated {format} report for case {case_id}: version {version}")
+        return {'report_id': report.id}
         
     except Exception as e:
         logger.error(f"Error generating report for case {case_id}: {str(e)}")
+        return {'error': str(e)}
+
+
+@shared_task
+def compile_latex_task(latex_source):
+    """
+    Compile custom LaTeX source to PDF off the request path
+    
+    Args:
+        latex_source: LaTeX document source
+    
+    Returns:
+        {'path': storage name of the PDF} or {'error': message}
+        The PDF goes to default storage; only its name passes through the result backend
+    """
+    import os
+    import shutil
+    import uuid
+    from django.core.files import File
+    from django.core.files.storage import default_storage
+    from .services.latex_report_generator import latex_generator
+    
+    pdf_path, error = latex_generator.compile_custom_latex_to_file(latex_source)
+    if error:
+        return {'error': error}
+    try:
+        with open(pdf_path, 'rb') as f:
+            name = default_storage.save(
+                f"compiled/{timezone.now():%Y/%m/%d}/{uuid.uuid4().hex}.pdf", File(f)
+            )
+    finally:
+        shutil.rmtree(os.path.dirname(pdf_path), ignore_errors=True)
+    return {'path': name}
+
+
+@shared_task
+def prune_expired_task_output():
+    """
+    Delete compiled PDFs nobody fetched and QueuedTask rows once their results have expired
+    Runs hourly from CELERY_BEAT_SCHEDULE
+    """
+    from datetime import timedelta
+    from django.core.files.storage import default_storage
+    from .models import QueuedTask
+    
+    cutoff = timezone.now() - timedelta(seconds=settings.CELERY_RESULT_EXPIRES)
+    
+    removed_files = 0
+    pending = ['compiled'] if default_storage.exists('compiled') else []
+    while pending:
+        directory = pending.pop()
+        subdirs, files = default_storage.listdir(directory)
+        pending.extend(f'{directory}/{subdir}' for subdir in subdirs)
+        for filename in files:
+            name = f'{directory}/{filename}'
+            if default_storage.get_modified_time(name) < cutoff:
+                default_storage.delete(name)
+                removed_files += 1
+    
+    removed_tasks, _ = QueuedTask.objects.filter(created_at__lt=cutoff).delete()
+    logger.info(f"Pruned {removed_files} compiled PDFs and {removed_tasks} queued task records")
@@ -0,0 +1,44 @@
+"""
+File upload handlers
+Hash evidence while it streams in, so chain of custody needs no second read pass
+"""
+import hashlib
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+# Leading bytes kept for log type detection
+HEADER_SIZE = 8192
+
+
+class SHA256UploadMixin:
+    """
+    Feeds each received chunk into SHA-256 and keeps the first HEADER_SIZE bytes
+    The completed UploadedFile carries the hex digest as `sha256` and those bytes as `header`
+    """
+
+    def new_file(self, *args, **kwargs):
+        self._sha256 = hashlib.sha256()
+        self._header = b''
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self._sha256.update(raw_data)
+        if len(self._header) < HEADER_SIZE:
+            self._header += raw_data[:HEADER_SIZE - len(self._header)]
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file_obj = super().file_complete(file_size)
+        if file_obj is not None:
+            file_obj.sha256 = self._sha256.hexdigest()
+            file_obj.header = self._header
+        return file_obj
+
+
+class HashingMemoryFileUploadHandler(SHA256UploadMixin, MemoryFileUploadHandler):
+    """In-memory upload handler (small files) that hashes on the fly"""
+    pass
+
+
+class HashingTemporaryFileUploadHandler(SHA256UploadMixin, TemporaryFileUploadHandler):
+    """Temp-file upload handler (large files) that hashes on the fly"""
+    pass
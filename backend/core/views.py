@@ -9,30 +9,62 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.exceptions import ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Q, Avg
+from django.db import transaction, IntegrityError, close_old_connections
+from django.db.models import Count, Q, Avg, Sum, F, OuterRef, Subquery
+from django.db.models.functions import Substr
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from celery.result import AsyncResult
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import csv
+import io
+import json
 import logging
+import os
+import shutil
+import time
+import traceback
+import zipfile
 
 logger = logging.getLogger(__name__)
 
 from .models import (
     Case, EvidenceFile, ParsedEvent, ScoredEvent,
-    StoryPattern, InvestigationNote, Report
+    StoryPattern, InvestigationNote, Report, QueuedTask, count_subquery, REPORT_MESSAGE_CHARS
 )
 from .serializers import (
-    CaseSerializer, EvidenceFileSerializer, ParsedEventSerializer,
+    UserSerializer, CaseSerializer, EvidenceFileSerializer, ParsedEventSerializer,
     ScoredEventSerializer, StoryPatternSerializer, InvestigationNoteSerializer,
-    ReportSerializer, DashboardSummarySerializer
+    ReportSerializer
 )
 from .services.log_detection import detect_log_type
+from .upload_handlers import HEADER_SIZE
 from .services.hashing import calculate_sha256
+from .services.parsers.factory import ParserFactory
+from .services.latex_report_generator import latex_generator
+from .services.llm_row_inference import get_llm_service, strip_code_fences
+from .services.zip_stream import stream_zip
+from .services.broker import celery_available
+from .services.response_cache import (
+    SUMMARY_CACHE_TTL, AI_ANALYSIS_CACHE_TTL, case_cache_ttl, dashboard_version, make_etag, not_modified,
+    cached_response, cached_json_response, render_json, stream_json
+)
 from .tasks import (
     parse_evidence_file_task, score_events_task, score_events_bulk_task,
-    generate_story_task, generate_report_task
+    generate_story_task, generate_report_task, generate_llm_explanation_task,
+    compile_latex_task, save_parsed_events
 )
 
+# Fallback for parsing uploads off the request thread when the Celery broker is down;
+# bounded so a burst of uploads can't starve the server
+_PARSER_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix='evidence-parse')
+
 
 class CaseViewSet(viewsets.ModelViewSet):
     """
@@ -48,7 +80,7 @@ class CaseViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Return only cases created by the current user"""
-        return Case.objects.filter(created_by=self.request.user)
+        return Case.objects.filter(created_by=self.request.user).select_related('created_by').with_counts()
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -59,7 +91,8 @@ class CaseViewSet(viewsets.ModelViewSet):
         case = self.get_object()
         case.status = 'CLOSED'
         case.closed_at = timezone.now()
-        case.save()
+        # updated_at is auto_now but still has to be listed to be written
+        case.save(update_fields=['status', 'closed_at', 'updated_at'])
         return Response({'status': 'case closed'})
     
     @action(detail=True, methods=['get'])
@@ -67,23 +100,39 @@ class CaseViewSet(viewsets.ModelViewSet):
         """Get case summary statistics"""
         case = self.get_object()
         
-        # Aggregate statistics
-        evidence_files = case.evidence_files.all()
-        scored_events = ScoredEvent.objects.filter(
-            parsed_event__evidence_file__case=case
-        )
-        
-        summary = {
-            'case': CaseSerializer(case).data,
-            'evidence_count': evidence_files.count(),
-            'total_events': scored_events.count(),
-            'high_risk_events': scored_events.filter(risk_label='HIGH').count(),
-            'critical_events': scored_events.filter(risk_label='CRITICAL').count(),
-            'avg_confidence': scored_events.aggregate(Avg('confidence'))['confidence__avg'] or 0,
-            'story_count': case.story_patterns.count(),
-        }
+        # Cached per case, keyed on updated_at (bumped by writes that change these numbers)
+        version = case.updated_at.timestamp()
+        etag = make_etag('case-summary', case.pk, version)
+        unchanged = not_modified(request, etag, case.updated_at)
+        if unchanged:
+            return unchanged
+        
+        cache_key = f'case:{case.pk}:summary:{version}'
+        summary = cache.get(cache_key)
+        if summary is None:
+            # Average confidence and story count as scalar subqueries of one query
+            stats = Case.objects.filter(pk=case.pk).values(
+                avg_confidence=Subquery(
+                    ScoredEvent.objects.for_case(OuterRef('pk')).order_by().values(
+                        'parsed_event__evidence_file__case_id'
+                    ).annotate(avg=Avg('confidence')).values('avg')
+                ),
+                story_total=count_subquery(StoryPattern.objects.filter(case=OuterRef('pk'))),
+            ).get()
+            summary = {
+                'case': CaseSerializer(case).data,
+                # Annotated by CaseQuerySet.with_counts()
+                'evidence_count': case.evidence_total,
+                # Denormalized counters maintained by ScoredEvent writes
+                'total_events': case.total_events,
+                'high_risk_events': case.high_risk_events,
+                'critical_events': case.critical_events,
+                'avg_confidence': stats['avg_confidence'] or 0,
+                'story_count': stats['story_total'],
+            }
+            cache.set(cache_key, summary, case_cache_ttl(case.status))
         
-        return Response(summary)
+        return cached_response(summary, etag, last_modified=case.updated_at)
     
     @action(detail=True, methods=['post'])
     def score(self, request, pk=None):
@@ -94,7 +143,9 @@ class CaseViewSet(viewsets.ModelViewSet):
         # Get all parsed events for this case
         parsed_events = ParsedEvent.objects.filter(evidence_file__case=case)
         
-        if parsed_events.count() == 0:
+        # The response reports the size too, so count once rather than exists() + count()
+        events_count = parsed_events.count()
+        if not events_count:
             return Response(
                 {'error': 'No parsed events found. Upload and parse evidence files first.'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -102,17 +153,19 @@ class CaseViewSet(viewsets.ModelViewSet):
         
         # Trigger bulk scoring task
         try:
-            from .tasks import score_events_bulk_task
+            # Fail fast on a known-down broker instead of waiting out the publish timeout
+            if not celery_available():
+                raise ConnectionError('Celery broker unreachable')
             task = score_events_bulk_task.delay(case.id, threshold)
             return Response({
                 'status': 'scoring initiated',
-                'events_count': parsed_events.count(),
+                'events_count': events_count,
                 'task_id': str(task.id),
                 'threshold': threshold
             })
         except Exception as e:
             return Response(
-                {'status': 'partial', 'message': f'Celery not available: {str(e)}', 'events_count': parsed_events.count()},
+                {'status': 'partial', 'message': f'Celery not available: {str(e)}', 'events_count': events_count},
                 status=status.HTTP_202_ACCEPTED
             )
     
@@ -124,12 +177,11 @@ class CaseViewSet(viewsets.ModelViewSet):
         model = request.data.get('model', 'gpt-4')
         
         # Check if there are scored events
-        scored_events = ScoredEvent.objects.filter(
-            parsed_event__evidence_file__case=case,
-            is_archived=False
-        )
+        scored_events = ScoredEvent.objects.for_case(case).active()
         
-        if scored_events.count() == 0:
+        # The response reports the size too, so count once rather than exists() + count()
+        events_count = scored_events.count()
+        if not events_count:
             return Response(
                 {'error': 'No scored events found. Run scoring first.'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -137,11 +189,14 @@ class CaseViewSet(viewsets.ModelViewSet):
         
         # Trigger story generation
         try:
+            # Fail fast on a known-down broker instead of waiting out the publish timeout
+            if not celery_available():
+                raise ConnectionError('Celery broker unreachable')
             task = generate_story_task.delay(case.id, provider=provider, model=model)
             return Response({
                 'status': 'story generation initiated',
                 'task_id': str(task.id),
-                'events_count': scored_events.count(),
+                'events_count': events_count,
                 'provider': provider,
                 'model': model
             })
@@ -168,12 +223,16 @@ class CaseViewSet(viewsets.ModelViewSet):
         
         # Trigger report generation
         try:
+            # Fail fast on a known-down broker instead of waiting out the publish timeout
+            if not celery_available():
+                raise ConnectionError('Celery broker unreachable')
             task = generate_report_task.delay(
                 case.id, 
                 format_type, 
                 request.user.id,
                 include_llm_explanations=include_llm
             )
+            QueuedTask.record(task.id, request.user)
             return Response({
                 'status': 'report generation initiated',
                 'task_id': str(task.id),
@@ -201,7 +260,15 @@ class EvidenceFileViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Return only evidence files from cases owned by the current user"""
-        return EvidenceFile.objects.filter(case__created_by=self.request.user)
+        return EvidenceFile.objects.filter(
+            case__created_by=self.request.user
+        ).select_related('uploaded_by').with_counts()
+    
+    def perform_destroy(self, instance):
+        case_id = instance.case_id
+        instance.delete()
+        # Cascade deletes bypass ScoredEvent.delete(), so recount
+        Case.refresh_event_counters(case_id)
     
     def perform_create(self, serializer):
         try:
@@ -217,83 +284,100 @@ class EvidenceFileViewSet(viewsets.ModelViewSet):
             
             case_id = case.id
             
-            # Calculate hash
-            file_hash = calculate_sha256(file_obj)
+            # Hash computed while the upload streamed in; re-read only as a fallback
+            file_hash = getattr(file_obj, 'sha256', None) or calculate_sha256(file_obj)
             
-            # Check if file already exists in THIS case only
-            existing_file = EvidenceFile.objects.filter(
-                file_hash=file_hash, 
-                case_id=case_id
-            ).first()
-            if existing_file:
+            # Extract filename if not provided
+            filename = serializer.validated_data.get('filename', file_obj.name)
+            
+            # Detect the log type from the leading bytes before the INSERT, not after it
+            header = getattr(file_obj, 'header', None)
+            if header is None:
+                header = file_obj.read(HEADER_SIZE)
+                file_obj.seek(0)
+            
+            # The unique (case, file_hash) constraint is the duplicate guard:
+            # no pre-check query on the happy path, and no check-then-insert race
+            try:
+                with transaction.atomic():
+                    evidence = serializer.save(
+                        uploaded_by=self.request.user,
+                        filename=filename,
+                        file_hash=file_hash,
+                        file_size=file_obj.size,
+                        log_type=detect_log_type(file_obj.name, filename, header=header),
+                    )
+            except IntegrityError:
+                # Only a row with this hash makes it a duplicate; anything else is a real error
+                existing_file = EvidenceFile.objects.only('id', 'filename', 'uploaded_at').filter(
+                    file_hash=file_hash, case_id=case_id
+                ).first()
+                if existing_file is None:
+                    raise
                 raise ValidationError({
                     'detail': f'File already exists in this case: {existing_file.filename} (uploaded {existing_file.uploaded_at.strftime("%Y-%m-%d %H:%M")})',
                     'existing_file_id': existing_file.id,
                     'duplicate': True
                 })
+            Case.touch(case_id)
             
-            # Extract filename if not provided
-            filename = serializer.validated_data.get('filename', file_obj.name)
-            
-            # Save with filename
-            evidence = serializer.save(
-                uploaded_by=self.request.user,
-                filename=filename,
-                file_hash=file_hash,
-                file_size=file_obj.size,
-            )
-            
-            # Detect log type - handle potential file path issues
-            try:
-                file_path = evidence.file.path
-                log_type = detect_log_type(file_path, evidence.filename)
-            except Exception as e:
-                # Fallback to filename-based detection
-                logger.warning(f"Could not get file path for detection: {e}")
-                log_type = 'CSV' if evidence.filename.lower().endswith('.csv') else 'UNKNOWN'
-            
-            evidence.log_type = log_type
-            evidence.save()
-            
-            # Attempt synchronous parsing - don't fail if parsing fails
-            # Parsing errors are stored in the evidence record
-            try:
-                self._parse_evidence_sync(evidence.id)
-            except Exception as parse_error:
-                logger.error(f"Parsing failed for evidence {evidence.id}: {parse_error}")
-                evidence.parse_error = str(parse_error)
-                evidence.save()
-                # Don't raise - file is uploaded, just parsing failed
+            # Parse in the background once the row is committed, so the upload returns
+            # immediately; the client polls until is_parsed (errors land in parse_error)
+            transaction.on_commit(lambda: self._dispatch_parse(evidence.id))
                 
         except ValidationError:
             raise
         except Exception as e:
             logger.error(f"Error uploading evidence: {str(e)}")
-            import traceback
             logger.error(traceback.format_exc())
             raise ValidationError({'detail': f'Upload failed: {str(e)}'})
     
-    def _parse_evidence_sync(self, evidence_id):
-        """Synchronous parsing fallback when Celery is not available"""
-        import os
-        from .models import EvidenceFile, ParsedEvent
-        from .services.parsers.factory import ParserFactory
+    def _dispatch_parse(self, evidence_id):
+        """Queue parsing on Celery; the in-process pool is only used while the broker is down"""
+        try:
+            # Fail fast on a known-down broker instead of waiting out the publish timeout
+            if not celery_available():
+                raise ConnectionError('Celery broker unreachable')
+            parse_evidence_file_task.delay(evidence_id)
+        except Exception as celery_error:
+            logger.warning(f"Celery not available, parsing in process: {celery_error}")
+            _PARSER_POOL.submit(self._parse_evidence_background, evidence_id)
+    
+    def _parse_evidence_background(self, evidence_id):
+        """Parser pool job: parse a new upload on its own DB connection"""
+        close_old_connections()
+        try:
+            self._parse_evidence_sync(evidence_id)
+        except Exception as parse_error:
+            # Don't raise - file is uploaded, just parsing failed
+            logger.error(f"Parsing failed for evidence {evidence_id}: {parse_error}")
+            EvidenceFile.objects.filter(id=evidence_id).update(parse_error=str(parse_error))
+        finally:
+            close_old_connections()
+    
+    def _parse_evidence_sync(self, evidence_id, evidence=None):
+        """
+        Synchronous parsing fallback when Celery is not available
+        Returns the number of events saved, or None if parsing failed
+        """
         
         try:
-            evidence = EvidenceFile.objects.get(id=evidence_id)
+            # Reuse the caller's instance when it already has one
+            if evidence is None:
+                evidence = EvidenceFile.objects.get(id=evidence_id)
             
             # Check file exists - handle potential path access errors
             try:
                 file_path = evidence.file.path if evidence.file else None
             except Exception as path_err:
                 evidence.parse_error = f"Cannot access file path: {path_err}"
-                evidence.save()
+                evidence.save(update_fields=['parse_error'])
                 logger.error(f"Cannot access file path for evidence {evidence_id}: {path_err}")
                 return
             
             if not file_path or not os.path.exists(file_path):
                 evidence.parse_error = f"File not found: {file_path}"
-                evidence.save()
+                evidence.save(update_fields=['parse_error'])
                 logger.error(f"File not found for evidence {evidence_id}: {file_path}")
                 return
             
@@ -301,34 +385,40 @@ class EvidenceFileViewSet(viewsets.ModelViewSet):
             
             if not parser:
                 evidence.parse_error = f"No parser available for log type: {evidence.log_type}"
-                evidence.save()
+                evidence.save(update_fields=['parse_error'])
                 return
             
+            started = time.perf_counter()
             events = parser.parse(file_path)
+            parse_seconds = time.perf_counter() - started
             
-            for event_data in events:
-                ParsedEvent.objects.create(
-                    evidence_file=evidence,
-                    **event_data
-                )
+            # Batched multi-row INSERTs in one transaction, as the Celery task does
+            started = time.perf_counter()
+            saved = save_parsed_events(evidence, events)
+            insert_seconds = time.perf_counter() - started
             
             evidence.is_parsed = True
             evidence.parsed_at = timezone.now()
             evidence.parse_error = ''
-            evidence.save()
+            evidence.save(update_fields=['is_parsed', 'parsed_at', 'parse_error'])
+            Case.touch(evidence.case_id)
             
-            logger.info(f"Synchronously parsed {len(events)} events from {evidence.filename}")
+            logger.info(
+                f"Synchronously parsed {len(events)} events from {evidence.filename} "
+                f"({evidence.log_type}: parse {parse_seconds:.2f}s, insert {insert_seconds:.2f}s)"
+            )
             
             # Scoring will be triggered by Celery task after parsing completes
+            return saved
             
         except Exception as e:
             logger.error(f"Error parsing evidence file {evidence_id}: {str(e)}")
-            import traceback
             logger.error(traceback.format_exc())
             try:
-                evidence = EvidenceFile.objects.get(id=evidence_id)
+                if evidence is None:
+                    evidence = EvidenceFile.objects.get(id=evidence_id)
                 evidence.parse_error = str(e)
-                evidence.save()
+                evidence.save(update_fields=['parse_error'])
             except:
                 pass
     
@@ -345,7 +435,6 @@ class EvidenceFileViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def reparse(self, request, pk=None):
         """Trigger re-parsing of evidence file"""
-        import os
         try:
             evidence = self.get_object()
             
@@ -367,25 +456,25 @@ class EvidenceFileViewSet(viewsets.ModelViewSet):
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # Clear existing parsed events
-            from .models import ParsedEvent
             ParsedEvent.objects.filter(evidence_file=evidence).delete()
+            # Cascade deletes bypass ScoredEvent.delete(), so recount
+            Case.refresh_event_counters(evidence.case_id)
             evidence.is_parsed = False
             evidence.parse_error = ''
-            evidence.save()
+            evidence.save(update_fields=['is_parsed', 'parse_error'])
             
             # Always use sync parsing for reliability (Celery may not be available)
             # This ensures parsing happens immediately rather than being queued
-            self._parse_evidence_sync(evidence.id)
-            evidence.refresh_from_db()
+            # The parse updates this instance and reports its count: no refresh or COUNT needed
+            event_count = self._parse_evidence_sync(evidence.id, evidence=evidence)
             return Response({
                 'status': 'parsing completed (sync)',
                 'is_parsed': evidence.is_parsed,
-                'event_count': evidence.parsed_events.count(),
+                'event_count': event_count or 0,
                 'parse_error': evidence.parse_error
             })
         except Exception as e:
             logger.error(f"Reparse error: {str(e)}")
-            import traceback
             return Response({
                 'error': str(e),
                 'traceback': traceback.format_exc()
@@ -406,7 +495,9 @@ class ParsedEventViewSet(viewsets.ReadOnlyModelViewSet):
     
     def get_queryset(self):
         """Return only events from cases owned by the current user"""
-        return ParsedEvent.objects.filter(evidence_file__case__created_by=self.request.user)
+        return ParsedEvent.objects.select_related('evidence_file').filter(
+            evidence_file__case__created_by=self.request.user
+        )
 
 
 class ScoredEventViewSet(viewsets.ModelViewSet):
@@ -424,10 +515,12 @@ class ScoredEventViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Return only scored events from cases owned by the current user"""
+        # Join only what the serializer reads (evidence_filename); the ownership
+        # filter joins case in SQL without selecting its columns
         return ScoredEvent.objects.select_related(
             'parsed_event',
             'parsed_event__evidence_file',
-            'parsed_event__evidence_file__case'
+            'reviewed_by'
         ).filter(
             parsed_event__evidence_file__case__created_by=self.request.user
         )
@@ -468,13 +561,12 @@ class ScoredEventViewSet(viewsets.ModelViewSet):
         event.is_false_positive = True
         event.reviewed_by = request.user
         event.reviewed_at = timezone.now()
-        event.save()
+        event.save(update_fields=['is_false_positive', 'reviewed_by', 'reviewed_at'])
         return Response({'status': 'marked as false positive'})
     
     @action(detail=True, methods=['post'])
     def generate_explanation(self, request, pk=None):
         """Generate LLM explanation for event"""
-        from .tasks import generate_llm_explanation_task
         event = self.get_object()
         generate_llm_explanation_task.delay(event.id)
         return Response({'status': 'explanation generation initiated'})
@@ -482,8 +574,6 @@ class ScoredEventViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
         """Export scored events as CSV file"""
-        from django.http import HttpResponse
-        import csv
         
         case_id = request.query_params.get('case_id')
         if not case_id:
@@ -491,11 +581,13 @@ class ScoredEventViewSet(viewsets.ModelViewSet):
         
         try:
             # Get events for the case owned by current user
-            events = ScoredEvent.objects.filter(
-                parsed_event__evidence_file__case_id=case_id,
-                parsed_event__evidence_file__case__created_by=request.user,
-                is_archived=False
-            ).select_related('parsed_event').order_by('-confidence')
+            events = ScoredEvent.objects.for_case(case_id).active().filter(
+                parsed_event__evidence_file__case__created_by=request.user
+            ).select_related('parsed_event').only(
+                'confidence', 'risk_label', 'inference_text',
+                'parsed_event__timestamp', 'parsed_event__event_type', 'parsed_event__user',
+                'parsed_event__host', 'parsed_event__raw_message',
+            ).order_by('-confidence')
             
             # Create CSV response
             response = HttpResponse(content_type='text/csv')
@@ -514,8 +606,8 @@ class ScoredEventViewSet(viewsets.ModelViewSet):
                 'Raw Message'
             ])
             
-            # Write events
-            for event in events:
+            # Write events (stream rows in chunks instead of loading the whole case)
+            for event in events.iterator(chunk_size=2000):
                 writer.writerow([
                     str(event.parsed_event.timestamp) if event.parsed_event.timestamp else '',
                     event.parsed_event.event_type or '',
@@ -551,7 +643,6 @@ class ScoringViewSet(viewsets.ViewSet):
             return Response({'error': 'case_id required'}, status=status.HTTP_400_BAD_REQUEST)
         
         # Trigger bulk scoring for all parsed events in case
-        from .tasks import score_events_bulk_task
         task = score_events_bulk_task.delay(case_id)
         
         return Response({
@@ -566,7 +657,6 @@ class ScoringViewSet(viewsets.ViewSet):
         if not case_id:
             return Response({'error': 'case_id required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        from .tasks import score_events_bulk_task
         task = score_events_bulk_task.delay(case_id, recalculate=True)
         
         return Response({
@@ -591,21 +681,20 @@ class FilterViewSet(viewsets.ViewSet):
             return Response({'error': 'case_id required'}, status=status.HTTP_400_BAD_REQUEST)
         
         # Archive events below threshold using bulk update
-        scored_events = ScoredEvent.objects.filter(
-            parsed_event__evidence_file__case_id=case_id
-        )
+        scored_events = ScoredEvent.objects.for_case(case_id)
         
         # Bulk archive below threshold
         archived_count = scored_events.filter(
             confidence__lt=threshold,
             is_archived=False
-        ).update(is_archived=True)
+        ).update(is_archived=True, archived_at=timezone.now())
         
         # Bulk restore above threshold
         scored_events.filter(
             confidence__gte=threshold,
             is_archived=True
-        ).update(is_archived=False)
+        ).update(is_archived=False, archived_at=None)
+        Case.touch(case_id)
         
         return Response({
             'status': 'filter applied',
@@ -621,15 +710,35 @@ class FilterViewSet(viewsets.ViewSet):
         if not case_id:
             return Response({'error': 'case_id required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        scored_events = ScoredEvent.objects.filter(
-            parsed_event__evidence_file__case_id=case_id
-        )
+        # Verify ownership and read the version stamp in one lookup
+        updated_at = Case.objects.filter(
+            id=case_id, created_by=request.user
+        ).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return Response({'error': 'Case not found or access denied'}, status=status.HTTP_404_NOT_FOUND)
         
-        return Response({
-            'total_events': scored_events.count(),
-            'archived_events': scored_events.filter(is_archived=True).count(),
-            'active_events': scored_events.filter(is_archived=False).count(),
-        })
+        version = updated_at.timestamp()
+        etag = make_etag('filter-state', case_id, version)
+        unchanged = not_modified(request, etag, updated_at)
+        if unchanged:
+            return unchanged
+        
+        cache_key = f'case:{case_id}:filter-state:{version}'
+        state = cache.get(cache_key)
+        if state is None:
+            # Total and archived counts in a single conditional-aggregate query
+            counts = ScoredEvent.objects.for_case(case_id).aggregate(
+                total=Count('id'),
+                archived=Count('id', filter=Q(is_archived=True)),
+            )
+            state = {
+                'total_events': counts['total'],
+                'archived_events': counts['archived'],
+                'active_events': counts['total'] - counts['archived'],
+            }
+            cache.set(cache_key, state, SUMMARY_CACHE_TTL)
+        
+        return cached_response(state, etag, last_modified=updated_at)
     
     @action(detail=False, methods=['post'])
     def reset(self, request):
@@ -639,17 +748,15 @@ class FilterViewSet(viewsets.ViewSet):
         if not case_id:
             return Response({'error': 'case_id required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        scored_events = ScoredEvent.objects.filter(
-            parsed_event__evidence_file__case_id=case_id,
+        # Bulk restore in a single UPDATE
+        restored_count = ScoredEvent.objects.for_case(case_id).filter(
             is_archived=True
-        )
-        
-        for event in scored_events:
-            event.restore()
+        ).update(is_archived=False, archived_at=None)
+        Case.touch(case_id)
         
         return Response({
             'status': 'filters reset',
-            'restored_count': scored_events.count()
+            'restored_count': restored_count
         })
 
 
@@ -668,6 +775,15 @@ class StoryPatternViewSet(viewsets.ModelViewSet):
         """Return only stories from cases owned by the current user"""
         return StoryPattern.objects.filter(case__created_by=self.request.user)
     
+    def perform_create(self, serializer):
+        story = serializer.save()
+        Case.touch(story.case_id)
+    
+    def perform_destroy(self, instance):
+        case_id = instance.case_id
+        instance.delete()
+        Case.touch(case_id)
+    
     @action(detail=False, methods=['post'])
     def generate(self, request):
         """Generate story from high-confidence events"""
@@ -688,7 +804,7 @@ class StoryPatternViewSet(viewsets.ModelViewSet):
         
         # Increment regeneration count
         story.regenerated_count += 1
-        story.save()
+        story.save(update_fields=['regenerated_count'])
         
         # Trigger regeneration
         generate_story_task.delay(story.case_id, story_id=story.id)
@@ -728,14 +844,12 @@ class ReportViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Return only reports from cases owned by the current user"""
-        return Report.objects.filter(case__created_by=self.request.user)
+        return Report.objects.filter(case__created_by=self.request.user).select_related('generated_by')
     
     @action(detail=False, methods=['get'], url_path='capabilities', url_name='capabilities')
     def capabilities(self, request):
         """Check what report capabilities are available on this server"""
         try:
-            from .services.latex_report_generator import latex_generator
-            
             local_pdflatex = latex_generator._is_pdflatex_available()
             
             # PDF is always available now - either via local pdflatex or online API
@@ -774,13 +888,26 @@ class ReportViewSet(viewsets.ModelViewSet):
             except Case.DoesNotExist:
                 return Response({'error': 'Case not found or access denied'}, status=status.HTTP_404_NOT_FOUND)
             
-            # Try async first, fall back to sync if Celery not available
+            # Compiles take up to a minute: queue them and let the client poll task_status
             try:
-                generate_report_task.delay(case_id, report_format, request.user.id)
-                return Response({'status': 'report generation initiated'})
+                # Fail fast on a known-down broker instead of waiting out the publish timeout
+                if not celery_available():
+                    raise ConnectionError('Celery broker unreachable')
+                task = generate_report_task.delay(case_id, report_format, request.user.id)
+                QueuedTask.record(task.id, request.user)
+                return Response(
+                    {'status': 'queued', 'task_id': task.id},
+                    status=status.HTTP_202_ACCEPTED
+                )
             except Exception as celery_error:
+                # Only local development may tie up a request thread with the compile
+                if not settings.DEBUG:
+                    logger.error(f"Report queue unavailable: {celery_error}")
+                    return Response(
+                        {'error': 'Report generation is temporarily unavailable, please retry shortly'},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE
+                    )
                 logger.warning(f"Celery not available, running synchronously: {celery_error}")
-                # Run synchronously
                 generate_report_task(case_id, report_format, request.user.id)
                 return Response({'status': 'report generation completed'})
                 
@@ -788,44 +915,66 @@ class ReportViewSet(viewsets.ModelViewSet):
             logger.error(f"Report generate error: {str(e)}")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    @action(detail=False, methods=['get'])
+    def task_status(self, request):
+        """State of a queued generate job"""
+        task_id = request.query_params.get('task_id')
+        if not task_id:
+            return Response({'error': 'task_id required'}, status=status.HTTP_400_BAD_REQUEST)
+        if not QueuedTask.owned_by(task_id, request.user):
+            return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        result = AsyncResult(task_id)
+        data = {'task_id': task_id, 'status': result.state.lower()}
+        if result.failed():
+            data['error'] = str(result.result)
+        elif result.successful() and isinstance(result.result, dict):
+            # {'report_id': ...} or {'error': ...} from generate_report_task
+            data.update(result.result)
+            if 'error' in data:
+                data['status'] = 'failure'
+        return Response(data)
+    
     @action(detail=True, methods=['get'])
     def download(self, request, pk=None):
         """Download report file - serves file directly"""
-        from django.http import FileResponse
-        import os
         
         report = self.get_object()
+        missing = Response(
+            {'error': 'Report file not found on server'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+        if not report.file:
+            return missing
+        
+        # Let nginx/Apache stream the file when offloading is configured
+        if settings.SENDFILE_HEADER:
+            if not os.path.exists(report.file.path):
+                return missing
+            response = HttpResponse(content_type=report.content_type)
+            response['Content-Disposition'] = f'attachment; filename="{report.download_filename}"'
+            if settings.SENDFILE_HEADER == 'X-Accel-Redirect':
+                response['X-Accel-Redirect'] = f"{settings.SENDFILE_URL_PREFIX}{report.file.name}"
+            else:
+                response[settings.SENDFILE_HEADER] = report.file.path
+            return response
         
-        # Check if file exists
-        if not report.file or not os.path.exists(report.file.path):
-            return Response(
-                {'error': 'Report file not found on server'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
-        # Determine content type based on format
-        content_types = {
-            'PDF': 'application/pdf',
-            'PDF_LATEX': 'application/pdf',
-            'CSV': 'text/csv',
-            'JSON': 'application/json',
-        }
-        content_type = content_types.get(report.format, 'application/octet-stream')
-        
-        # Create filename
-        extension = report.format.lower() if report.format != 'PDF_LATEX' else 'pdf'
-        filename = f"report_case_{report.case.id}_v{report.version}.{extension}"
+        # Open and return file; a failed open is the existence check (no separate stat)
+        try:
+            file_handle = open(report.file.path, 'rb')
+        except FileNotFoundError:
+            return missing
         
-        # Open and return file
         try:
             file_response = FileResponse(
-                open(report.file.path, 'rb'),
+                file_handle,
                 as_attachment=True,
-                filename=filename,
-                content_type=content_type
+                filename=report.download_filename,
+                content_type=report.content_type
             )
             return file_response
         except Exception as e:
+            file_handle.close()
             return Response(
                 {'error': f'Failed to download file: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -836,13 +985,21 @@ class ReportViewSet(viewsets.ModelViewSet):
         """Get preview URL for report (for API consumers who need URL)"""
         report = self.get_object()
         
+        # One stat for the size; a missing file reports 0 rather than erroring
+        size = 0
+        if report.file:
+            try:
+                size = report.file.size
+            except FileNotFoundError:
+                pass
+        
         return Response({
             'preview_url': report.file.url,
-            'filename': f"report_case_{report.case.id}_v{report.version}.{report.format.lower()}",
+            'filename': report.download_filename,
             'format': report.format,
             'hash': report.file_hash,
             'generated_at': report.generated_at.isoformat(),
-            'size_mb': report.file.size / (1024*1024) if report.file else 0
+            'size_mb': size / (1024*1024)
         })
     
     @action(detail=False, methods=['post'])
@@ -853,11 +1010,8 @@ class ReportViewSet(viewsets.ModelViewSet):
             return Response({'error': 'case_id required'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            from .models import Case, ScoredEvent
-            from .services.latex_report_generator import latex_generator
-            
             try:
-                case = Case.objects.get(id=case_id)
+                case = Case.objects.with_report_data().get(id=case_id)
             except Case.DoesNotExist:
                 return Response(
                     {'error': f'Case with id {case_id} not found'},
@@ -879,39 +1033,44 @@ class ReportViewSet(viewsets.ModelViewSet):
             }
             
             # Evidence files
-            for evidence in case.evidence_files.all():
+            evidence_rows = case.evidence_files.values(
+                'filename', 'file_hash', 'uploaded_at', 'uploaded_by__username'
+            )
+            for evidence in evidence_rows:
                 case_data['evidence_files'].append({
-                    'filename': evidence.filename or 'Unknown',
-                    'file_hash': evidence.file_hash or '',
-                    'uploaded_at': evidence.uploaded_at.strftime('%Y-%m-%d %H:%M:%S'),
-                    'uploaded_by': evidence.uploaded_by.username if evidence.uploaded_by else 'Unknown',
+                    'filename': evidence['filename'] or 'Unknown',
+                    'file_hash': evidence['file_hash'] or '',
+                    'uploaded_at': evidence['uploaded_at'].strftime('%Y-%m-%d %H:%M:%S'),
+                    'uploaded_by': evidence['uploaded_by__username'] or 'Unknown',
                 })
             
-            # Scored events
-            scored_events = ScoredEvent.objects.filter(
-                parsed_event__evidence_file__case=case,
-                is_archived=False
-            ).select_related('parsed_event').order_by('-confidence')[:500]
+            # Scored events (value rows streamed in chunks)
+            scored_events = ScoredEvent.objects.for_case(case).active().report_rows(
+                500, message_chars=REPORT_MESSAGE_CHARS
+            )
             
-            for event in scored_events:
+            for event in scored_events.iterator(chunk_size=200):
                 case_data['scored_events'].append({
-                    'timestamp': str(event.parsed_event.timestamp) if event.parsed_event.timestamp else '',
-                    'event_type': event.parsed_event.event_type or '',
-                    'user': event.parsed_event.user or 'N/A',
-                    'host': event.parsed_event.host or 'N/A',
-                    'confidence': float(event.confidence),
-                    'risk_label': event.risk_label or 'UNKNOWN',
-                    'inference_text': event.inference_text or '',
-                    'raw_message': event.parsed_event.raw_message or '',
+                    'timestamp': str(event['timestamp']) if event['timestamp'] else '',
+                    'event_type': event['event_type'] or '',
+                    'user': event['user'] or 'N/A',
+                    'host': event['host'] or 'N/A',
+                    'confidence': float(event['confidence']),
+                    'risk_label': event['risk_label'] or 'UNKNOWN',
+                    'inference_text': event['inference_text'] or '',
+                    'raw_message': event['raw_message'] or '',
                 })
             
             # Story patterns
-            for story in case.story_patterns.all():
+            story_rows = case.story_patterns.values(
+                'title', 'narrative_text', 'attack_phase', 'avg_confidence'
+            )
+            for story in story_rows:
                 case_data['stories'].append({
-                    'title': story.title or 'Untitled',
-                    'narrative': story.narrative_text or '',
-                    'attack_phase': story.attack_phase or 'Unknown',
-                    'avg_confidence': float(story.avg_confidence) if story.avg_confidence else 0.0,
+                    'title': story['title'] or 'Untitled',
+                    'narrative': story['narrative_text'] or '',
+                    'attack_phase': story['attack_phase'] or 'Unknown',
+                    'avg_confidence': float(story['avg_confidence']) if story['avg_confidence'] else 0.0,
                 })
             
             # Generate LaTeX source
@@ -924,12 +1083,17 @@ class ReportViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
             
-            return Response({
-                'latex_source': latex_source,
+            fields = {
                 'case_name': case.name,
                 'event_count': len(case_data['scored_events']),
                 'story_count': len(case_data['stories'])
-            })
+            }
+            # Drop the row dicts before the (multi-MB) source goes out in chunks
+            del case_data
+            return StreamingHttpResponse(
+                stream_json('latex_source', latex_source, fields),
+                content_type='application/json'
+            )
             
         except Exception as e:
             logger.error(f"Error generating LaTeX preview: {str(e)}")
@@ -938,11 +1102,50 @@ class ReportViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['get'])
+    def compile_result(self, request):
+        """Fetch the PDF of a queued compile_custom_latex job"""
+        
+        task_id = request.query_params.get('task_id')
+        filename = request.query_params.get('filename', 'custom_report.pdf')
+        if not task_id:
+            return Response({'error': 'task_id required'}, status=status.HTTP_400_BAD_REQUEST)
+        if not QueuedTask.owned_by(task_id, request.user):
+            return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        result = AsyncResult(task_id)
+        if not result.ready():
+            return Response({'status': result.state.lower()}, status=status.HTTP_202_ACCEPTED)
+        if result.failed():
+            return Response(
+                {'error': f'LaTeX compilation failed: {result.result}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        
+        payload = result.get()
+        if payload.get('error'):
+            return Response(
+                {'error': f"LaTeX compilation failed: {payload['error']}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            pdf_file = default_storage.open(payload['path'], 'rb')
+        except FileNotFoundError:
+            return Response({'error': 'Compiled PDF no longer available'}, status=status.HTTP_404_NOT_FOUND)
+        # One-shot download: the open handle outlives the deleted file, as with the sync path
+        default_storage.delete(payload['path'])
+        
+        return FileResponse(
+            pdf_file,
+            as_attachment=True,
+            filename=filename,
+            content_type='application/pdf'
+        )
+    
     @action(detail=False, methods=['post'])
     def compile_custom_latex(self, request):
         """Compile custom LaTeX source code to PDF"""
-        from django.http import FileResponse
-        import io
         
         latex_source = request.data.get('latex_source')
         filename = request.data.get('filename', 'custom_report.pdf')
@@ -951,11 +1154,24 @@ class ReportViewSet(viewsets.ModelViewSet):
         if not latex_source:
             return Response({'error': 'latex_source required'}, status=status.HTTP_400_BAD_REQUEST)
         
+        # Optionally compile on a worker; poll compile_result with the task id
+        if request.data.get('async'):
+            try:
+                # Fail fast on a known-down broker instead of waiting out the publish timeout
+                if not celery_available():
+                    raise ConnectionError('Celery broker unreachable')
+                task = compile_latex_task.delay(latex_source)
+                QueuedTask.record(task.id, request.user)
+                return Response(
+                    {'status': 'compilation queued', 'task_id': task.id},
+                    status=status.HTTP_202_ACCEPTED
+                )
+            except Exception as celery_error:
+                logger.warning(f"Celery not available, compiling synchronously: {celery_error}")
+        
         try:
-            from .services.latex_report_generator import latex_generator
-            
             # Compile custom LaTeX to PDF (uses online API if local pdflatex not available)
-            pdf_bytes, error = latex_generator.compile_custom_latex(latex_source)
+            pdf_path, error = latex_generator.compile_custom_latex_to_file(latex_source)
             
             if error:
                 if fallback_to_tex:
@@ -973,10 +1189,11 @@ class ReportViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Return PDF file
-            pdf_buffer = io.BytesIO(pdf_bytes)
+            # Stream the PDF from disk; the open handle outlives its temp directory
+            pdf_file = open(pdf_path, 'rb')
+            shutil.rmtree(os.path.dirname(pdf_path), ignore_errors=True)
             return FileResponse(
-                pdf_buffer,
+                pdf_file,
                 as_attachment=True,
                 filename=filename,
                 content_type='application/pdf'
@@ -1007,22 +1224,31 @@ class ReportViewSet(viewsets.ModelViewSet):
             return Response({'error': 'case_id required'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            from .models import Case, ScoredEvent
-            from .services.llm_row_inference import get_llm_service
-            
-            # Get case
+            # Get case (the prompt only reads its name and description)
             try:
-                case = Case.objects.get(id=case_id, created_by=request.user)
+                case = Case.objects.only('name', 'description', 'updated_at').get(
+                    id=case_id, created_by=request.user
+                )
             except Case.DoesNotExist:
                 return Response({'error': 'Case not found'}, status=status.HTTP_404_NOT_FOUND)
             
-            # Get events
-            events = ScoredEvent.objects.filter(
-                parsed_event__evidence_file__case=case,
-                is_archived=False
-            ).select_related('parsed_event').order_by('-confidence')[:100]
+            # Gemini results are cached per case version - repeat views skip the LLM round-trip
+            cache_key = f'case:{case.pk}:ai-analysis:{case.updated_at.timestamp()}'
+            analysis = cache.get(cache_key)
+            if analysis is not None:
+                return Response(analysis)
+            
+            active_events = ScoredEvent.objects.for_case(case).active()
+            
+            # Risk distribution as one GROUP BY (order_by() drops Meta ordering from the grouping)
+            risk_counts = {'CRITICAL': 0, 'HIGH': 0, 'MEDIUM': 0, 'LOW': 0}
+            risk_counts.update({
+                row['risk_label']: row['count']
+                for row in active_events.order_by().values('risk_label').annotate(count=Count('id'))
+            })
+            event_count = sum(risk_counts.values())
             
-            if not events.exists():
+            if not event_count:
                 return Response({
                     'summary': 'No events found to analyze. Please upload and parse evidence files first.',
                     'risk_overview': 'N/A',
@@ -1031,20 +1257,29 @@ class ReportViewSet(viewsets.ModelViewSet):
                     'event_count': 0
                 })
             
+            # Top events for the prompt, as plain rows with only the prompt's columns
+            events = active_events.order_by('-confidence').values(
+                'risk_label',
+                'confidence',
+                timestamp=F('parsed_event__timestamp'),
+                event_type=F('parsed_event__event_type'),
+                user=F('parsed_event__user'),
+                host=F('parsed_event__host'),
+                # Only the first 100 characters reach the prompt; trim before they leave the DB
+                message=Substr('parsed_event__raw_message', 1, 100),
+            )[:20]
+            
             # Prepare event summary for AI
             event_summary = []
-            risk_counts = {'CRITICAL': 0, 'HIGH': 0, 'MEDIUM': 0, 'LOW': 0}
-            
             for event in events:
-                risk_counts[event.risk_label] = risk_counts.get(event.risk_label, 0) + 1
                 event_summary.append({
-                    'timestamp': str(event.parsed_event.timestamp) if event.parsed_event.timestamp else '',
-                    'type': event.parsed_event.event_type or 'Unknown',
-                    'user': event.parsed_event.user or 'N/A',
-                    'host': event.parsed_event.host or 'N/A',
-                    'risk': event.risk_label,
-                    'confidence': f"{event.confidence:.1%}",
-                    'message': (event.parsed_event.raw_message or '')[:150],
+                    'timestamp': str(event['timestamp']) if event['timestamp'] else '',
+                    'type': event['event_type'] or 'Unknown',
+                    'user': event['user'] or 'N/A',
+                    'host': event['host'] or 'N/A',
+                    'risk': event['risk_label'],
+                    'confidence': f"{event['confidence']:.1%}",
+                    'message': event['message'] or '',
                 })
             
             # Build AI prompt
@@ -1060,7 +1295,7 @@ Risk Distribution:
 - LOW: {risk_counts.get('LOW', 0)} events
 
 Top Events (sorted by confidence):
-{chr(10).join([f"- [{e['risk']}] {e['type']} by {e['user']} on {e['host']}: {e['message'][:100]}" for e in event_summary[:20]])}
+{chr(10).join([f"- [{e['risk']}] {e['type']} by {e['user']} on {e['host']}: {e['message']}" for e in event_summary])}
 
 Please provide:
 1. **Executive Summary** (2-3 sentences explaining what happened in simple terms)
@@ -1075,7 +1310,6 @@ Format your response as JSON with keys: summary, risk_assessment, key_findings (
                 llm_service = get_llm_service()
                 
                 if llm_service.provider == 'google':
-                    import json
                     response = llm_service.client.generate_content(
                         prompt,
                         generation_config={
@@ -1088,38 +1322,34 @@ Format your response as JSON with keys: summary, risk_assessment, key_findings (
                     # Try to parse as JSON
                     try:
                         # Clean up response (remove markdown code blocks if present)
-                        cleaned = ai_response.strip()
-                        if cleaned.startswith('```json'):
-                            cleaned = cleaned[7:]
-                        if cleaned.startswith('```'):
-                            cleaned = cleaned[3:]
-                        if cleaned.endswith('```'):
-                            cleaned = cleaned[:-3]
+                        ai_data = json.loads(strip_code_fences(ai_response))
                         
-                        ai_data = json.loads(cleaned.strip())
-                        
-                        return Response({
+                        analysis = {
                             'summary': ai_data.get('summary', 'Analysis completed'),
                             'risk_assessment': ai_data.get('risk_assessment', f"Found {sum(risk_counts.values())} events"),
                             'key_findings': ai_data.get('key_findings', []),
                             'recommendations': ai_data.get('recommendations', []),
                             'risk_counts': risk_counts,
-                            'event_count': len(events),
+                            'event_count': event_count,
                             'case_name': case.name,
                             'generated_by': 'Gemini AI'
-                        })
+                        }
                     except json.JSONDecodeError:
                         # Return raw response if not valid JSON
-                        return Response({
+                        analysis = {
                             'summary': ai_response[:500],
                             'risk_assessment': f"Analyzed {sum(risk_counts.values())} events",
                             'key_findings': [ai_response[500:1000]] if len(ai_response) > 500 else [],
                             'recommendations': ['Review the full analysis above'],
                             'risk_counts': risk_counts,
-                            'event_count': len(events),
+                            'event_count': event_count,
                             'case_name': case.name,
                             'generated_by': 'Gemini AI'
-                        })
+                        }
+                    
+                    # Only real LLM output is cached; fallbacks retry on the next request
+                    cache.set(cache_key, analysis, AI_ANALYSIS_CACHE_TTL)
+                    return Response(analysis)
                 else:
                     # Fallback for non-Google providers
                     return Response({
@@ -1128,7 +1358,7 @@ Format your response as JSON with keys: summary, risk_assessment, key_findings (
                         'key_findings': [f"Found {v} {k.lower()} risk events" for k, v in risk_counts.items() if v > 0],
                         'recommendations': ['Review high-confidence events', 'Generate detailed PDF report', 'Check event timeline'],
                         'risk_counts': risk_counts,
-                        'event_count': len(events),
+                        'event_count': event_count,
                         'case_name': case.name,
                         'generated_by': 'Rule-based analysis'
                     })
@@ -1142,7 +1372,7 @@ Format your response as JSON with keys: summary, risk_assessment, key_findings (
                     'key_findings': [f"Detected {v} {k.lower()} severity events" for k, v in risk_counts.items() if v > 0],
                     'recommendations': ['Configure GOOGLE_API_KEY for AI analysis', 'Review events manually'],
                     'risk_counts': risk_counts,
-                    'event_count': len(events),
+                    'event_count': event_count,
                     'case_name': case.name,
                     'generated_by': 'Fallback (AI unavailable)',
                     'error': str(llm_error)
@@ -1161,7 +1391,6 @@ Format your response as JSON with keys: summary, risk_assessment, key_findings (
         Analyze parsed log events with Gemini AI
         Accepts events directly from frontend for immediate analysis
         """
-        import json
         
         events_data = request.data.get('events', [])
         analysis_type = request.data.get('analysis_type', 'security')  # security, performance, general
@@ -1171,7 +1400,6 @@ Format your response as JSON with keys: summary, risk_assessment, key_findings (
         
         try:
             import google.generativeai as genai
-            import os
             
             api_key = os.getenv('GOOGLE_API_KEY')
             if not api_key:
@@ -1257,16 +1485,10 @@ Please provide your analysis in the following JSON format:
             )
             
             # Parse response
-            ai_response = response.text.strip()
-            if ai_response.startswith('```json'):
-                ai_response = ai_response[7:]
-            if ai_response.startswith('```'):
-                ai_response = ai_response[3:]
-            if ai_response.endswith('```'):
-                ai_response = ai_response[:-3]
+            ai_response = strip_code_fences(response.text)
             
             try:
-                analysis = json.loads(ai_response.strip())
+                analysis = json.loads(ai_response)
                 analysis['generated_by'] = 'Gemini AI'
                 analysis['model'] = os.getenv('DEFAULT_LLM_MODEL', 'gemini-2.0-flash')
                 analysis['event_stats'] = stats
@@ -1289,7 +1511,6 @@ Please provide your analysis in the following JSON format:
     
     def _calculate_event_stats(self, events):
         """Calculate statistics from events"""
-        from collections import Counter
         
         stats = {
             'total': len(events),
@@ -1309,7 +1530,6 @@ Please provide your analysis in the following JSON format:
                 parsed_ts = []
                 for ts in timestamps:
                     if isinstance(ts, str):
-                        from datetime import datetime
                         try:
                             parsed_ts.append(datetime.fromisoformat(ts.replace('Z', '+00:00')))
                         except:
@@ -1326,7 +1546,6 @@ Please provide your analysis in the following JSON format:
     
     def _generate_fallback_analysis(self, events):
         """Generate basic analysis without AI"""
-        from collections import Counter
         
         stats = self._calculate_event_stats(events)
         
@@ -1389,19 +1608,13 @@ Please provide your analysis in the following JSON format:
     @action(detail=False, methods=['post'])
     def generate_combined(self, request):
         """Generate nested LaTeX PDF report with accompanying CSV"""
-        from django.http import FileResponse
-        import zipfile
-        import os
         
         case_id = request.data.get('case_id')
         if not case_id:
             return Response({'error': 'case_id required'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            from .models import Case, ScoredEvent
-            from .services.latex_report_generator import latex_generator
-            
-            case = Case.objects.get(id=case_id)
+            case = Case.objects.with_report_data().get(id=case_id)
             
             # Prepare case data
             case_data = {
@@ -1418,52 +1631,50 @@ Please provide your analysis in the following JSON format:
             }
             
             # Evidence files
-            for evidence in case.evidence_files.all():
+            evidence_rows = case.evidence_files.values(
+                'filename', 'file_hash', 'uploaded_at', 'uploaded_by__username'
+            )
+            for evidence in evidence_rows:
                 case_data['evidence_files'].append({
-                    'filename': evidence.filename or 'Unknown',
-                    'file_hash': evidence.file_hash or '',
-                    'uploaded_at': evidence.uploaded_at.strftime('%Y-%m-%d %H:%M:%S'),
-                    'uploaded_by': evidence.uploaded_by.username if evidence.uploaded_by else 'Unknown',
+                    'filename': evidence['filename'] or 'Unknown',
+                    'file_hash': evidence['file_hash'] or '',
+                    'uploaded_at': evidence['uploaded_at'].strftime('%Y-%m-%d %H:%M:%S'),
+                    'uploaded_by': evidence['uploaded_by__username'] or 'Unknown',
                 })
             
-            # Scored events
-            scored_events = ScoredEvent.objects.filter(
-                parsed_event__evidence_file__case=case,
-                is_archived=False
-            ).select_related('parsed_event').order_by('-confidence')[:500]
+            # Scored events (value rows streamed in chunks)
+            scored_events = ScoredEvent.objects.for_case(case).active().report_rows(
+                500, message_chars=REPORT_MESSAGE_CHARS
+            )
             
-            for event in scored_events:
+            for event in scored_events.iterator(chunk_size=200):
                 case_data['scored_events'].append({
-                    'timestamp': str(event.parsed_event.timestamp) if event.parsed_event.timestamp else '',
-                    'event_type': event.parsed_event.event_type or '',
-                    'user': event.parsed_event.user or 'N/A',
-                    'host': event.parsed_event.host or 'N/A',
-                    'confidence': float(event.confidence),
-                    'risk_label': event.risk_label or 'UNKNOWN',
-                    'inference_text': event.inference_text or '',
-                    'raw_message': event.parsed_event.raw_message or '',
+                    'timestamp': str(event['timestamp']) if event['timestamp'] else '',
+                    'event_type': event['event_type'] or '',
+                    'user': event['user'] or 'N/A',
+                    'host': event['host'] or 'N/A',
+                    'confidence': float(event['confidence']),
+                    'risk_label': event['risk_label'] or 'UNKNOWN',
+                    'inference_text': event['inference_text'] or '',
+                    'raw_message': event['raw_message'] or '',
                 })
             
             # Story patterns
-            for story in case.story_patterns.all():
+            story_rows = case.story_patterns.values(
+                'title', 'narrative_text', 'attack_phase', 'avg_confidence'
+            )
+            for story in story_rows:
                 case_data['stories'].append({
-                    'title': story.title or 'Untitled',
-                    'narrative': story.narrative_text or '',
-                    'attack_phase': story.attack_phase or 'Unknown',
-                    'avg_confidence': float(story.avg_confidence) if story.avg_confidence else 0.0,
+                    'title': story['title'] or 'Untitled',
+                    'narrative': story['narrative_text'] or '',
+                    'attack_phase': story['attack_phase'] or 'Unknown',
+                    'avg_confidence': float(story['avg_confidence']) if story['avg_confidence'] else 0.0,
                 })
             
             # Generate PDF and CSV report (LaTeX source only editable on website, not downloaded)
             latex_content, pdf_bytes, csv_data = latex_generator.generate_nested_latex_report(case_data)
             
-            import io
-            zip_buffer = io.BytesIO()
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                # Only include PDF and CSV in download - no LaTeX source code
-                zip_file.writestr(f'report_case_{case.id}.pdf', pdf_bytes)
-                zip_file.writestr(f'report_case_{case.id}_data.csv', csv_data.encode('utf-8'))
-                
-                metadata = f"""Case Report - {case.name}
+            metadata = f"""Case Report - {case.name}
 Generated: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}
 Status: {case.status}
 Events Analyzed: {len(case_data['scored_events'])} real parsed events
@@ -1473,15 +1684,23 @@ Evidence Files: {len(case_data['evidence_files'])} uploaded files
 Note: LaTeX source can be edited on the website using 'Preview & Edit LaTeX' button.
 This package contains the compiled PDF report and raw CSV data only.
 """
-                zip_file.writestr('README.txt', metadata)
             
-            zip_buffer.seek(0)
-            
-            return FileResponse(
-                zip_buffer,
-                as_attachment=True,
-                filename=f"report_case_{case.id}_combined.zip",
-                content_type='application/zip'
+            # Only include PDF and CSV in download - no LaTeX source code
+            # PDF streams are already deflated, so store it; fast level-1 deflate for the CSV
+            # The sub-KB README is stored too - a compressor would cost more than it saves
+            entries = [
+                (f'report_case_{case.id}.pdf', pdf_bytes, zipfile.ZIP_STORED, None),
+                (f'report_case_{case.id}_data.csv', csv_data.encode('utf-8'), zipfile.ZIP_DEFLATED, 1),
+                ('README.txt', metadata.encode('utf-8'), zipfile.ZIP_STORED, None),
+            ]
+            
+            # Stream the archive as it is compressed: no whole-ZIP buffer, first byte sent right away
+            return StreamingHttpResponse(
+                stream_zip(entries),
+                content_type='application/zip',
+                headers={
+                    'Content-Disposition': f'attachment; filename="report_case_{case.id}_combined.zip"'
+                }
             )
             
         except Exception as e:
@@ -1505,88 +1724,160 @@ class DashboardViewSet(viewsets.ViewSet):
         try:
             user = request.user
             
-            # Aggregate statistics for current user only
-            total_cases = Case.objects.filter(created_by=user).count()
-            total_evidence = EvidenceFile.objects.filter(case__created_by=user).count()
-            total_events = ScoredEvent.objects.filter(parsed_event__evidence_file__case__created_by=user).count()
-            high_risk = ScoredEvent.objects.filter(
-                parsed_event__evidence_file__case__created_by=user,
-                risk_label='HIGH', 
-                is_archived=False
-            ).count()
-            critical = ScoredEvent.objects.filter(
-                parsed_event__evidence_file__case__created_by=user,
-                risk_label='CRITICAL', 
-                is_archived=False
-            ).count()
-            
-            # Recent cases for current user
-            recent_cases = Case.objects.filter(created_by=user).order_by('-created_at')[:5]
-            
-            # Risk distribution for current user
-            risk_dist = ScoredEvent.objects.filter(
-                parsed_event__evidence_file__case__created_by=user,
-                is_archived=False
-            ).values('risk_label').annotate(count=Count('id'))
-            risk_distribution = {item['risk_label']: item['count'] for item in risk_dist}
-            
-            # Confidence distribution (bins) for current user
-            user_events = ScoredEvent.objects.filter(
-                parsed_event__evidence_file__case__created_by=user,
-                is_archived=False
-            )
-            confidence_bins = {
-                '0.0-0.3': user_events.filter(confidence__lt=0.3).count(),
-                '0.3-0.6': user_events.filter(confidence__gte=0.3, confidence__lt=0.6).count(),
-                '0.6-0.8': user_events.filter(confidence__gte=0.6, confidence__lt=0.8).count(),
-                '0.8-1.0': user_events.filter(confidence__gte=0.8).count(),
-            }
-            
-            summary_data = {
-                'total_cases': total_cases,
-                'total_evidence_files': total_evidence,
-                'total_events': total_events,
-                'high_risk_events': high_risk,
-                'critical_events': critical,
-                'recent_cases': CaseSerializer(recent_cases, many=True).data,
-                'risk_distribution': risk_distribution,
-                'confidence_distribution': confidence_bins,
-            }
-            
-            return Response(summary_data)
+            # Cached per user, keyed on a version stamp of their cases
+            version = dashboard_version(user)
+            etag = make_etag('dashboard-summary', user.id, version)
+            unchanged = not_modified(request, etag)
+            if unchanged:
+                return unchanged
+            
+            # Already-shaped payload: render it once and cache the JSON bytes (no serializer pass)
+            cache_key = f'dashboard:summary:{user.id}:{version}'
+            body = cache.get(cache_key)
+            if body is None:
+                body = render_json(self._compute_summary(user))
+                cache.set(cache_key, body, SUMMARY_CACHE_TTL)
+            
+            return cached_json_response(body, etag)
         except Exception as e:
             logger.error(f"Dashboard summary error: {str(e)}")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    def _compute_summary(self, user):
+        """Run the dashboard aggregates for one user"""
+        # Aggregate statistics for current user only (cases, evidence and events in one query)
+        case_stats = Case.objects.filter(created_by=user).annotate(
+            evidence_total=count_subquery(EvidenceFile.objects.filter(case=OuterRef('pk')))
+        ).aggregate(
+            total_cases=Count('id'),
+            total_evidence=Sum('evidence_total'),
+            total_events=Sum('total_events'),
+        )
+        
+        # All ScoredEvent counters (risk labels and confidence bins) in one conditional-aggregate query
+        active = Q(is_archived=False)
+        event_stats = ScoredEvent.objects.for_user(user).aggregate(
+            **{
+                f'risk_{label}': Count('id', filter=active & Q(risk_label=label))
+                for label, _ in ScoredEvent.RISK_LABELS
+            },
+            bin_0_3=Count('id', filter=active & Q(confidence__lt=0.3)),
+            bin_3_6=Count('id', filter=active & Q(confidence__gte=0.3, confidence__lt=0.6)),
+            bin_6_8=Count('id', filter=active & Q(confidence__gte=0.6, confidence__lt=0.8)),
+            bin_8_10=Count('id', filter=active & Q(confidence__gte=0.8)),
+        )
+        
+        # Recent cases for current user, projected straight to CaseSerializer's shape;
+        # every row is owned by `user`, so the nested owner is serialized once
+        owner = UserSerializer(user).data
+        recent_cases = [
+            {**row, 'created_by': owner}
+            for row in Case.objects.filter(created_by=user).with_counts().order_by(
+                '-created_at'
+            ).values(
+                'id', 'name', 'description', 'status', 'created_at', 'updated_at', 'closed_at',
+                evidence_count=F('evidence_total'),
+                event_count=F('parsed_total'),
+            )[:5]
+        ]
+        
+        # Risk distribution for current user (labels with no events are omitted)
+        risk_distribution = {
+            label: event_stats[f'risk_{label}']
+            for label, _ in ScoredEvent.RISK_LABELS
+            if event_stats[f'risk_{label}']
+        }
+        
+        # Confidence distribution (bins) for current user
+        confidence_bins = {
+            '0.0-0.3': event_stats['bin_0_3'],
+            '0.3-0.6': event_stats['bin_3_6'],
+            '0.6-0.8': event_stats['bin_6_8'],
+            '0.8-1.0': event_stats['bin_8_10'],
+        }
+        
+        summary_data = {
+            'total_cases': case_stats['total_cases'],
+            'total_evidence_files': case_stats['total_evidence'] or 0,
+            'total_events': case_stats['total_events'] or 0,
+            'high_risk_events': event_stats['risk_HIGH'],
+            'critical_events': event_stats['risk_CRITICAL'],
+            'recent_cases': recent_cases,
+            'risk_distribution': risk_distribution,
+            'confidence_distribution': confidence_bins,
+        }
+        
+        return summary_data
+    
     @action(detail=False, methods=['get'])
     def timeline(self, request):
-        """Get timeline data for visualization"""
+        """
+        Get timeline data for visualization
+        Optional keyset paging: ?limit=N (max 1000) and ?after=<timestamp>&after_id=<id>
+        taken from the last item of the previous page, so polls fetch only newer events
+        """
         case_id = request.query_params.get('case_id')
         
         if not case_id:
             return Response({'error': 'case_id required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Verify user owns this case
-        case = Case.objects.filter(id=case_id, created_by=request.user).first()
-        if not case:
+        after_param = request.query_params.get('after')
+        try:
+            # Well-formed but out-of-range values (month 13) raise instead of returning None
+            after = parse_datetime(after_param) if after_param else None
+        except ValueError:
+            after = None
+        if after_param and after is None:
+            return Response({'error': 'after must be an ISO 8601 timestamp'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            after_id = int(request.query_params.get('after_id', 0))
+            limit = min(int(request.query_params.get('limit', 1000)), 1000)
+        except ValueError:
+            return Response({'error': 'after_id and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({'error': 'limit must be at least 1'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Verify ownership and read the version stamp in one lookup
+        case_row = Case.objects.filter(
+            id=case_id, created_by=request.user
+        ).values_list('updated_at', 'status').first()
+        if case_row is None:
             return Response({'error': 'Case not found or access denied'}, status=status.HTTP_404_NOT_FOUND)
         
-        # Get events ordered by time
-        events = ScoredEvent.objects.filter(
-            parsed_event__evidence_file__case_id=case_id,
-            is_archived=False
-        ).select_related('parsed_event').order_by('parsed_event__timestamp')[:1000]
-        
-        timeline_data = []
-        for event in events:
-            timeline_data.append({
-                'timestamp': event.parsed_event.timestamp,
-                'event_type': event.parsed_event.event_type,
-                'confidence': event.confidence,
-                'risk_label': event.risk_label,
-            })
-        
-        return Response(timeline_data)
+        updated_at, case_status = case_row
+        version = updated_at.timestamp()
+        page = f'{after_param or ""}:{after_id}:{limit}'
+        etag = make_etag('timeline', case_id, version, page)
+        unchanged = not_modified(request, etag, updated_at)
+        if unchanged:
+            return unchanged
+        
+        # Cached as rendered JSON, so a hit skips both the query and serialization
+        cache_key = f'case:{case_id}:timeline:{version}:{page}'
+        body = cache.get(cache_key)
+        if body is None:
+            events = ScoredEvent.objects.for_case(case_id).active()
+            if after is not None:
+                # (timestamp, id) keyset: events sharing the cursor's timestamp aren't skipped
+                events = events.filter(
+                    Q(parsed_event__timestamp__gt=after)
+                    | Q(parsed_event__timestamp=after, id__gt=after_id)
+                )
+            
+            # Get events ordered by time (only the returned columns, no model instances)
+            rows = events.order_by(
+                'parsed_event__timestamp', 'id'
+            ).values(
+                'id',
+                'confidence',
+                'risk_label',
+                timestamp=F('parsed_event__timestamp'),
+                event_type=F('parsed_event__event_type'),
+            )[:limit]
+            body = render_json(list(rows.iterator(chunk_size=500)))
+            cache.set(cache_key, body, case_cache_ttl(case_status))
+        
+        return cached_json_response(body, etag, last_modified=updated_at)
     
     @action(detail=False, methods=['get'])
     def confidence_distribution(self, request):
@@ -1596,28 +1887,39 @@ class DashboardViewSet(viewsets.ViewSet):
         if not case_id:
             return Response({'error': 'case_id required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Verify user owns this case
-        case = Case.objects.filter(id=case_id, created_by=request.user).first()
-        if not case:
+        # Verify ownership and read the version stamp in one lookup
+        case_row = Case.objects.filter(
+            id=case_id, created_by=request.user
+        ).values_list('updated_at', 'status').first()
+        if case_row is None:
             return Response({'error': 'Case not found or access denied'}, status=status.HTTP_404_NOT_FOUND)
         
-        events = ScoredEvent.objects.filter(
-            parsed_event__evidence_file__case_id=case_id,
-            is_archived=False
-        )
-        
-        # Create histogram bins
-        bins = [0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
-        distribution = []
-        
-        for i in range(len(bins) - 1):
-            count = events.filter(
-                confidence__gte=bins[i],
-                confidence__lt=bins[i+1]
-            ).count()
-            distribution.append({
-                'bin': f"{bins[i]:.1f}-{bins[i+1]:.1f}",
-                'count': count
+        updated_at, case_status = case_row
+        version = updated_at.timestamp()
+        etag = make_etag('confidence-distribution', case_id, version)
+        unchanged = not_modified(request, etag, updated_at)
+        if unchanged:
+            return unchanged
+        
+        cache_key = f'case:{case_id}:confidence-distribution:{version}'
+        distribution = cache.get(cache_key)
+        if distribution is None:
+            events = ScoredEvent.objects.for_case(case_id).active()
+            
+            # Create histogram bins
+            bins = [0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
+            labels = [f"{bins[i]:.1f}-{bins[i+1]:.1f}" for i in range(len(bins) - 1)]
+            
+            # Count every bin in a single conditional-aggregate query
+            counts = events.aggregate(**{
+                f'bin_{i}': Count('id', filter=Q(confidence__gte=bins[i], confidence__lt=bins[i+1]))
+                for i in range(len(bins) - 1)
             })
+            
+            distribution = [
+                {'bin': label, 'count': counts[f'bin_{i}']}
+                for i, label in enumerate(labels)
+            ]
+            cache.set(cache_key, distribution, case_cache_ttl(case_status))
         
-        return Response(distribution)
+        return cached_response(distribution, etag, last_modified=updated_at)
@@ -122,6 +122,8 @@ export interface Report {
   title?: string;
   content?: string;
   file_path?: string;
+  download_url?: string;
+  download_filename?: string;
   created_at?: string;
 }
 
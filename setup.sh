@@ -75,7 +75,7 @@ echo ""
 echo "Terminal 3 (Celery):"
 echo "  cd backend"
 echo "  source venv/bin/activate"
-echo "  celery -A config worker -l info"
+echo "  celery -A config worker -B -l info"
 echo ""
 echo "Terminal 4 (Frontend):"
 echo "  cd frontend"
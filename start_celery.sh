@@ -14,5 +14,5 @@ echo "Installing Celery and dependencies (if needed)..."
 pip install celery redis
 
 echo "Starting Celery worker..."
-celery -A config worker --loglevel=info --pool=solo
+celery -A config worker -B --loglevel=info --pool=solo
 